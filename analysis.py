@@ -0,0 +1,273 @@
+import os
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from config import CHUNK_SIZE
+from dedup import DedupPredictor, DedupStats
+from encoders import encode_frame
+from result_store import ResultWriter, iter_result_chunks, is_parquet, pq, result_filename
+from schema import INTEGER_FEATURES, NETWORK_FEATURES, WEB_FEATURES, sniff_schema
+
+FEATURES = {"network": NETWORK_FEATURES, "web": WEB_FEATURES}
+
+# Robust mapping: 0, "0", "normal", "benign" -> Benign. Everything else -> Attack.
+BENIGN_VALUES = ["normal", "0", "0.0", "benign"]
+
+
+class AnalysisError(Exception):
+    """A problem with the uploaded dataset that should be shown to the user."""
+
+
+def benign_mask(values):
+    """Vectorized version of the "is this prediction/label benign?" check."""
+    s = pd.Series(np.asarray(values)).astype(str).str.strip().str.lower()
+    return s.isin(BENIGN_VALUES).to_numpy()
+
+
+def missing_features_error(columns, mode):
+    """Build the user-facing error for a dataset that lacks model features."""
+    missing_features = [f for f in FEATURES[mode] if f not in columns]
+    if not missing_features:
+        return None
+
+    hint = ""
+    # Check if it looks like the user uploaded the WRONG dataset type
+    if mode == "web" and "duration" in columns:
+        hint = " (It looks like you uploaded a Network CSV to the Web module. Please switch to Network Analysis.)"
+    elif mode == "network" and "request_duration" in columns:
+        hint = " (It looks like you uploaded a Web CSV to the Network module. Please switch to Web Analysis.)"
+    elif "Flow Duration" in columns or "Dst Port" in columns:
+        hint = " (It looks like you are uploading a raw CIC-IDS2017 dataset. This demo ONLY works with the provided 'demo_network.csv' or 'demo_web.csv' files.)"
+    return f"Missing columns: {', '.join(missing_features)}.{hint}"
+
+
+def stage(timer, name):
+    """Time a pipeline stage on `timer` (a startup.StartupTimer) if one is given."""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+def timed_chunks(chunks, timer, name="parse"):
+    """Yield from `chunks`, counting the time spent producing each chunk as `name`."""
+    if timer is None:
+        yield from chunks
+        return
+    chunks = iter(chunks)
+    while True:
+        with timer.stage(name):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def read_dataset_chunks(filepath, mode, chunksize=CHUNK_SIZE):
+    """Open `filepath` as a stream of DataFrame chunks.
+
+    Returns (mode, columns, chunk_iterator, messages). Only the first few KB are
+    read up front (see schema.sniff_schema); headerless NSL-KDD files are
+    detected from them and switch the mode to network, exactly like the old
+    whole-file logic did.
+    """
+    messages = []
+    if is_parquet(filepath):
+        # Stored columnar data (e.g. a previous result) is re-analysed without any text parsing
+        try:
+            columns = list(pq.ParquetFile(filepath).schema_arrow.names)
+        except Exception as e:
+            raise AnalysisError(f"Parquet read error: {e}")
+        return mode, columns, iter_result_chunks(filepath, chunksize), messages
+
+    # Decide what the file is from its first few KB, then parse it exactly once
+    # with explicit names and dtypes (no second pass, no dtype inference on features)
+    try:
+        schema = sniff_schema(filepath)
+    except Exception as e:
+        raise AnalysisError(f"CSV read error: {e}")
+    if schema.kind == "empty":
+        raise AnalysisError("Uploaded CSV is empty")
+    print(f"DEBUG: Sniffed dataset schema: {schema}")
+
+    headerless = schema.kind == "nsl_kdd"
+    columns = schema.columns
+    if headerless:
+        print("DEBUG: Detected headerless Network dataset. Assigning headers...")
+        # AUTO-SWITCH MODE
+        if mode == "web":
+            mode = "network"
+            messages.append(("Auto-detected Network dataset. Switched to Network Analysis mode.", "info"))
+
+    try:
+        reader = pd.read_csv(filepath, chunksize=chunksize, **schema.read_csv_kwargs())
+    except pd.errors.EmptyDataError:
+        raise AnalysisError("Uploaded CSV is empty")
+    except Exception as e:
+        raise AnalysisError(f"CSV read error: {e}")
+
+    print(f"DEBUG: Uploaded file columns: {columns}")
+
+    def chunks():
+        try:
+            for chunk in reader:
+                # Fix Labels if they are strings (e.g., 'normal', 'neptune') -> 0/1
+                if headerless and "label" in chunk.columns:
+                    # 0 for normal, 1 for everything else
+                    chunk["label"] = (chunk["label"].astype(str).str.strip() != "normal").astype(int)
+                yield chunk
+        except AnalysisError:
+            raise
+        except Exception as e:
+            raise AnalysisError(f"CSV read error: {e}")
+
+    return mode, columns, chunks(), messages
+
+
+def analyze_chunk(chunk, mode, encoders, predict, dedup_stats=None, timer=None):
+    """encode -> predict -> label a single chunk.
+
+    Adds Prediction and (plain text) Severity columns to `chunk` in place, gives
+    its features their storage types (see storage_types) and returns the
+    boolean "is attack" array for the chunk. With a DedupPredictor, identical
+    encoded rows are scored once and counted in `dedup_stats`.
+    """
+    with stage(timer, "encode"):
+        try:
+            # Select and reorder columns, then encode string columns with the training encoders
+            df_to_predict = encode_frame(chunk[FEATURES[mode]].copy(), encoders)
+        except Exception as e:
+            raise AnalysisError(f"Data processing error: {e}")
+
+    with stage(timer, "predict"):
+        if isinstance(predict, DedupPredictor):
+            predictions = predict(df_to_predict, stats=dedup_stats)
+        else:
+            predictions = predict(df_to_predict)
+
+    with stage(timer, "label"):
+        is_attack = ~benign_mask(predictions)
+        chunk["Prediction"] = np.where(is_attack, "Attack", "Benign")
+        chunk["Severity"] = np.where(is_attack, "High", "Low")
+        storage_types(chunk, mode)
+    return is_attack
+
+
+def storage_types(chunk, mode):
+    """Give the scored features of `chunk` the types the result is stored and shown with.
+
+    Whole-number features were parsed as float64 for the model and become
+    nullable integers again (352, not 352.0) when every value in the chunk is
+    a whole number; otherwise (e.g. a normalised `duration`) they stay
+    float64. This only picks a storage type: it never rejects a file.
+    Categorical columns become plain strings, so the stored result sorts and
+    compares them by value rather than by category code.
+    """
+    for col in INTEGER_FEATURES[mode]:
+        if col in chunk.columns and chunk[col].dtype.kind == "f":
+            try:
+                # Raises for fractional or infinite values, which then keep their float dtype
+                chunk[col] = chunk[col].astype("Int64")
+            except (TypeError, ValueError, OverflowError):
+                pass
+    for col in chunk.columns:
+        if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = chunk[col].astype(object)
+
+
+def analyze_file(filepath, mode, predictors, encoders, result_folder, chunksize=CHUNK_SIZE, progress=None,
+                 timer=None):
+    """Stream an uploaded CSV through encode -> predict -> label.
+
+    Each chunk is appended straight to `result_folder/result_{mode}.parquet`
+    (.csv without pyarrow; mode after auto-detection), so only the running
+    counters are kept in memory.
+    `predictors` and `encoders` are keyed by mode ("network"/"web").
+    `progress`, if given, is called with the number of rows done after each chunk.
+    `timer`, if given, gets the time spent in each stage (see benchmark_pipeline.py).
+    """
+    with stage(timer, "sniff"):
+        mode, columns, chunks, messages = read_dataset_chunks(filepath, mode, chunksize)
+
+    error = missing_features_error(columns, mode)
+    if error:
+        raise AnalysisError(error)
+
+    result_path = os.path.join(result_folder, result_filename(mode))
+    summary = analyze_chunks(
+        chunks, mode, encoders[mode], predictors[mode], result_path,
+        has_label="label" in columns, progress=progress, timer=timer,
+    )
+    summary["messages"] = messages + summary["messages"]
+    return summary
+
+
+def analyze_chunks(chunks, mode, encoders, predict, result_path, has_label=False, progress=None, timer=None):
+    """encode -> predict -> label every chunk of an iterator and store it at `result_path`.
+
+    Shared by CSV uploads and PCAP replay. Returns the analysis summary used to
+    render result.html.
+    """
+    total_rows = 0
+    total_attacks = 0
+    correct = 0
+    ground_truth_attacks = 0
+    dedup_stats = DedupStats()
+
+    # The writer uses a partial file first so a failed analysis never leaves half a result behind
+    writer = ResultWriter(result_path)
+    try:
+        for chunk in timed_chunks(chunks, timer):
+            if chunk.empty:
+                continue
+            is_attack = analyze_chunk(chunk, mode, encoders, predict, dedup_stats, timer)
+
+            # --- ACCURACY CALCULATION (running counts instead of accuracy_score on the full frame) ---
+            if has_label:
+                with stage(timer, "accuracy"):
+                    truth_attack = ~benign_mask(chunk["label"])
+                    correct += int((truth_attack == is_attack).sum())
+                    ground_truth_attacks += int(truth_attack.sum())
+
+            with stage(timer, "write"):
+                writer.write(chunk)
+
+            total_rows += len(chunk)
+            total_attacks += int(is_attack.sum())
+            if progress:
+                progress(total_rows)
+    except BaseException:
+        writer.abort()
+        raise
+
+    # 4. Validate empty file
+    if total_rows == 0:
+        writer.abort()
+        raise AnalysisError("Uploaded CSV is empty")
+
+    with stage(timer, "write"):
+        writer.close()
+
+    accuracy_msg = None
+    if has_label:
+        accuracy_msg = f"{correct / total_rows * 100:.2f}%"
+        print(f"DEBUG: Accuracy calculated for {mode} upload: {accuracy_msg}")
+        print(f"DEBUG: Ground Truth Attacks: {ground_truth_attacks}, Predicted Attacks: {total_attacks}")
+
+    messages = []
+    if dedup_stats.rows:
+        print(f"DEBUG: Dedup for {mode} upload: {dedup_stats.to_dict()}")
+        messages.append((
+            f"{dedup_stats.rows:,} rows, {dedup_stats.unique_rows:,} distinct feature vectors "
+            f"(dedup ratio {dedup_stats.ratio:.1f}x): {dedup_stats.predicted:,} scored by the model, "
+            f"{dedup_stats.memo_hits:,} served from memo.", "info"))
+
+    return {
+        "mode": mode,
+        "result_path": result_path,
+        "total_rows": total_rows,
+        "total_attacks": total_attacks,
+        "total_benign": total_rows - total_attacks,
+        "accuracy": accuracy_msg,
+        "dedup": dedup_stats.to_dict() if dedup_stats.rows else None,
+        "messages": messages,
+    }
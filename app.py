@@ -1,21 +1,81 @@
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
-import pandas as pd
-import joblib
+# Imported first so the startup report covers every import below
+from startup import startup_timer
+from flask import (
+    Flask, render_template, request, redirect, url_for, session, flash, send_file,
+    Response, stream_with_context
+)
 import os
-from sklearn.metrics import accuracy_score
+import threading
+import time
+from analysis import AnalysisError, FEATURES, analyze_file
+from config import (
+    PREVIEW_ROWS, JOB_WORKERS, INFERENCE_WORKERS, INFERENCE_MIN_SHARD_ROWS,
+    USE_FLAT_FOREST, FLAT_FOREST_MAX_ROWS, LIVE_BATCH_SIZE, LIVE_MAX_LATENCY_MS, FLOW_IDLE_TIMEOUT,
+    FLOW_MAX_ACTIVE, LIVE_RING_CAPACITY, CAPTURE_BPF_FILTER, CAPTURE_PROTOCOLS, CAPTURE_SAMPLE_RATE,
+    CAPTURE_SAMPLE_MODE, MODEL_FOLDER, RESULT_CACHE_ENABLED, RESULT_CACHE_FOLDER, RESULT_CACHE_MAX_MB,
+    DEDUP_ENABLED, DEDUP_MEMO_SIZE, MODEL_SERVING, SCORING_API_KEYS,
+    WORKSPACE_FOLDER, WORKSPACE_TTL_HOURS, WORKSPACE_QUOTA_MB
+)
+from jobs import JobManager
+from parallel_inference import ParallelPredictor
+from forest_compiler import load_inference_engine, load_serving_model, route_small_batches
+from live_inference import LiveScorer
+from flow_tracker import FlowTracker
+from ring_buffer import DetectionRing
+from live_stream import StreamHub
+from capture_policy import CapturePolicy
+from pcap_replay import analyze_pcap
+from result_store import iter_csv_export
+from result_browser import ResultBrowser
+from result_cache import ResultCache
+from dedup import DedupPredictor
+from model_registry import ModelRegistry
+from scoring import attack_bytes, labels, records_frame, schema, score_binary, score_frame, score_record
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, StageMetrics, registry as metrics
+from workspace import WorkspaceFullError, WorkspaceManager
+
+startup_timer.mark("imports (flask, pandas, pipeline)")
 
 app = Flask(__name__)
 app.secret_key = "intru_guard_secret"
 
-import joblib
-
-# Load trained demo models and label encoders
-network_model = joblib.load("models/network_model.pkl")
-network_le = joblib.load("models/network_label_encoders.pkl")
-
-web_model = joblib.load("models/web_model.pkl")
-web_le = joblib.load("models/web_label_encoders.pkl")
+def build_predict(model, model_path):
+    """Inference stack for one loaded model: flat forest -> process pool -> dedup memo."""
+    # Flattened NumPy forest engine (same predictions as model.predict), only when enabled:
+    # for every batch (USE_FLAT_FOREST) or just for small ones (FLAT_FOREST_MAX_ROWS)
+    engine = load_inference_engine(model, model_path) if USE_FLAT_FOREST else model
+
+    # Optional multi-core inference: shard large batches across a process pool
+    close = None
+    if INFERENCE_WORKERS > 1:
+        predictor = ParallelPredictor(engine, model_path, INFERENCE_WORKERS, INFERENCE_MIN_SHARD_ROWS, USE_FLAT_FOREST)
+        predict, close = predictor.predict, predictor.close
+    else:
+        predict = engine.predict
+    if FLAT_FOREST_MAX_ROWS and not USE_FLAT_FOREST:
+        # Loaded on the first small batch; with MODEL_SERVING="shared" it is the read-only
+        # mapped export, so the small-batch engine adds one copy per host, not per worker
+        shared = MODEL_SERVING == "shared"
+        predict = route_small_batches(lambda: load_inference_engine(model, model_path, shared), predict,
+                                      FLAT_FOREST_MAX_ROWS)
+
+    # Score each distinct feature vector once (plus a memo of recent vectors across requests)
+    if DEDUP_ENABLED:
+        predict = DedupPredictor(predict, DEDUP_MEMO_SIZE)
+    return predict, close
+
+# Trained models and label encoders are loaded lazily (on first use, or warmed up in
+# the background by start_services) and hot-swapped when retrain_model.py /
+# retrain_models_demo.py publish new ones. Importing app.py unpickles nothing.
+def load_model(model_path):
+    """Map the shared flat forest when serving it is possible, else unpickle the model."""
+    return load_serving_model(model_path, shared=USE_FLAT_FOREST and MODEL_SERVING == "shared")
+
+model_registry = ModelRegistry(MODEL_FOLDER, build_predict, load_model=load_model)
+model_registry.register("network", "network_model.pkl", "network_label_encoders.pkl")
+model_registry.register("web", "web_model.pkl", "web_label_encoders.pkl")
+startup_timer.mark("model registry (lazy)")
 
 # Dummy users for login
 users = {
@@ -46,253 +106,349 @@ def dashboard():
         return redirect(url_for("login"))
     return render_template("dashboard.html")
 
-@app.route("/upload/<mode>", methods=["GET", "POST"])
-def upload(mode):
-    if "user" not in session:
-        return redirect(url_for("login"))
+# Upload modes: the two CSV schemas plus raw packet captures (replayed into network connections)
+ANALYSIS_MODES = list(FEATURES) + ["pcap"]
+
+def input_extension(mode):
+    return ".pcap" if mode == "pcap" else ".csv"
+
+# Re-uploads of the same file with the same models are served from this cache
+result_cache = ResultCache(RESULT_CACHE_FOLDER, MODEL_FOLDER, max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024) if RESULT_CACHE_ENABLED else None
+
+def current_bundles(mode):
+    """The model bundles an analysis of `mode` uses, taken once at its start."""
+    if mode == "pcap":
+        return {"network": model_registry.get("network")}
+    return {name: model_registry.get(name) for name in FEATURES}
+
+# Analysis metrics (scraped from /metrics): every stage of every chunk is timed
+ANALYSIS_STAGE_SECONDS = metrics.histogram(
+    "intruguard_analysis_stage_seconds", "Time spent per analysis stage (per chunk for chunked stages)",
+    labels=("mode", "stage"))
+ANALYSIS_SECONDS = metrics.histogram(
+    "intruguard_analysis_seconds", "End-to-end analysis time of an upload", labels=("mode",))
+ANALYSES_TOTAL = metrics.counter(
+    "intruguard_analyses_total", "Analyses by outcome (analysed, cached, error)", labels=("mode", "outcome"))
+ANALYSIS_ROWS_TOTAL = metrics.counter(
+    "intruguard_analysis_rows_total", "Rows analysed (cache hits excluded)", labels=("mode",))
+
+def run_analysis(filepath, mode, result_folder, progress=None):
+    """encode -> predict -> label an uploaded CSV (or PCAP capture), reusing cached results."""
+    start = time.perf_counter()
+    try:
+        # A hot-swap during the analysis doesn't change the models it started with
+        bundles = current_bundles(mode)
+        if result_cache is None:
+            summary = analyze_upload(filepath, mode, bundles, result_folder, progress)
+        else:
+            key = result_cache.key(filepath, mode, salt=",".join(b.version for b in bundles.values()))
+            summary = result_cache.get(key, result_folder)
+            if summary is not None:
+                print(f"DEBUG: Result cache hit for {mode} upload ({key})")
+                ANALYSES_TOTAL.labels(mode, "cached").inc()
+                if progress:
+                    progress(summary["total_rows"])
+                return summary
+
+            summary = analyze_upload(filepath, mode, bundles, result_folder, progress)
+            result_cache.put(key, summary)
+    except Exception:
+        ANALYSES_TOTAL.labels(mode, "error").inc()
+        raise
+
+    ANALYSES_TOTAL.labels(mode, "analysed").inc()
+    ANALYSIS_ROWS_TOTAL.labels(mode).inc(summary["total_rows"])
+    ANALYSIS_SECONDS.labels(mode).observe(time.perf_counter() - start)
+    return summary
+
+def analyze_upload(filepath, mode, bundles, result_folder, progress=None):
+    """encode -> predict -> label an uploaded CSV (or PCAP capture) with the given model bundles."""
+    timer = StageMetrics(ANALYSIS_STAGE_SECONDS, mode)
+    if mode == "pcap":
+        network = bundles["network"]
+        return analyze_pcap(filepath, network.predict, network.encoders, result_folder, progress=progress, timer=timer)
+    return analyze_file(
+        filepath, mode,
+        predictors={name: b.predict for name, b in bundles.items()},
+        encoders={name: b.encoders for name, b in bundles.items()},
+        result_folder=result_folder,
+        progress=progress,
+        timer=timer,
+    )
+
+# Every upload is analysed in its own workspace (input copy + result), so any number
+# of analyses can run side by side; expired workspaces are cleaned up after a TTL
+workspaces = WorkspaceManager(
+    WORKSPACE_FOLDER, ttl=WORKSPACE_TTL_HOURS * 3600, quota_bytes=WORKSPACE_QUOTA_MB * 1024 * 1024,
+)
+
+def run_job(job):
+    """Analyse a job's input into its workspace; the TTL of the workspace starts when it's done."""
+    try:
+        return run_analysis(job.filepath, job.mode, job.result_folder, progress=job.update_progress)
+    finally:
+        workspaces.release(job.id)
 
-    if request.method == "POST":
+# Background analysis jobs: uploads return a job id right away and run on a worker pool
+job_manager = JobManager(run_job, max_workers=JOB_WORKERS)
 
-        # 1. Check file presence
-        if "csv_file" not in request.files:
-            flash("No file part found", "danger")
-            return redirect(request.url)
+result_browser = ResultBrowser()
 
-        file = request.files["csv_file"]
+def render_summary(summary, download_url=None, rows_url=None):
+    """Render result.html for a finished analysis summary."""
+    for message, category in summary["messages"]:
+        flash(message, category)
 
-        if file.filename == "":
-            flash("No file selected", "danger")
-            return redirect(request.url)
+    # Optimize: No rows are rendered into the HTML any more; the table pages through
+    # the stored result via /api/results, so even 125k rows stay light in the browser.
+    total_rows = summary["total_rows"]
+    if total_rows > PREVIEW_ROWS:
+         flash(f"Analysis complete! Browse all {total_rows} rows below or download the CSV.", "success")
 
-        # 2. Save file safely
-        upload_folder = "uploads"
-        os.makedirs(upload_folder, exist_ok=True)
+    with ANALYSIS_STAGE_SECONDS.labels(summary["mode"], "render").time():
+        return render_template(
+            "result.html",
+            mode=summary["mode"],
+            accuracy=summary["accuracy"],  # Pass accuracy to template
+            total_rows=total_rows,  # Pass real row count
+            total_attacks=summary["total_attacks"],
+            total_benign=summary["total_benign"],
+            download_url=download_url or url_for("download_result", mode=summary["mode"]),
+            rows_url=rows_url or url_for("result_rows", mode=summary["mode"])
+        )
 
-        # Fix: Save as a temp file to avoid overwriting the source file if selected from 'uploads/'
-        # This prevents the browser "ERR_UPLOAD_FILE_CHANGED" error.
-        filepath = os.path.join(upload_folder, f"temp_{mode}_input.csv")
-        
-        # Robustness: Remove existing temp file if it exists to ensure clean state
-        if os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-            except Exception:
-                pass # Ignore if locked, save will likely fail/overwrite anyway
+def wants_async():
+    """Async uploads are requested by the upload page script (or any JSON client)."""
+    return request.values.get("async") == "1" or request.accept_mimetypes.best == "application/json"
 
-        file.save(filepath)
+@app.route("/upload/<mode>", methods=["GET", "POST"])
+def upload(mode):
+    if "user" not in session:
+        return redirect(url_for("login"))
 
-        flash("CSV file uploaded successfully", "success")
+    if mode not in ANALYSIS_MODES:
+        flash("Invalid analysis mode", "danger")
+        return redirect(url_for("dashboard"))
 
-        # 3. Read CSV
-        try:
-            # Try reading with header first
-            df = pd.read_csv(filepath)
-            
-            # --- AUTO-FIX: HEADERLESS NSL-KDD DATASET ---
-            # NSL-KDD typically has 41, 42, or 43 columns.
-            # If columns are weird (e.g. integers as strings '0', '1') or count matches NSL-KDD but names don't match
-            nsl_probed_columns = [
-                "duration", "protocol_type", "service", "flag", "src_bytes", "dst_bytes",
-                "land", "wrong_fragment", "urgent", "hot", "num_failed_logins",
-                "logged_in", "num_compromised", "root_shell", "su_attempted", "num_root",
-                "num_file_creations", "num_shells", "num_access_files", "num_outbound_cmds",
-                "is_host_login", "is_guest_login", "count", "srv_count", "serror_rate",
-                "srv_serror_rate", "rerror_rate", "srv_rerror_rate", "same_srv_rate",
-                "diff_srv_rate", "srv_diff_host_rate", "dst_host_count", "dst_host_srv_count",
-                "dst_host_same_srv_rate", "dst_host_diff_srv_rate", "dst_host_same_src_port_rate",
-                "dst_host_srv_diff_host_rate", "dst_host_serror_rate", "dst_host_srv_serror_rate",
-                "dst_host_rerror_rate", "dst_host_srv_rerror_rate", "label", "difficulty"
-            ]
-            
-            # Check if likely headerless NSL-KDD (approx 41-43 cols)
-            if 40 <= df.shape[1] <= 44:
-                # If first column is NOT 'duration', assume headerless and reload/set header
-                if df.columns[0] != "duration":
-                    print("DEBUG: Detected headerless Network dataset. Assigning headers...")
-                    # Reload without header to parse first row as data
-                    df = pd.read_csv(filepath, header=None)
-                    # Assign columns (trim list to match width)
-                    df.columns = nsl_probed_columns[:df.shape[1]]
-                    
-                    # Fix Labels if they are strings (e.g., 'normal', 'neptune') -> 0/1
-                    if "label" in df.columns:
-                         # 0 for normal, 1 for everything else
-                         df["label"] = df["label"].apply(lambda x: 0 if str(x).strip() == "normal" else 1)
-                    
-                    # AUTO-SWITCH MODE
-                    if mode == "web":
-                        mode = "network"
-                        flash("Auto-detected Network dataset. Switched to Network Analysis mode.", "info")
-
-            # Robustness: Strip whitespace from column names
-            df.columns = df.columns.str.strip()
-            print(f"DEBUG: Uploaded file columns: {df.columns.tolist()}")
-        except Exception as e:
-            flash(f"CSV read error: {e}", "danger")
-            return redirect(request.url)
-        
+    if request.method == "POST":
+        is_async = wants_async()
 
-        # 4. Validate empty file
-        if df.empty:
-            flash("Uploaded CSV is empty", "danger")
+        # 1. Check file presence
+        file = request.files.get("csv_file")
+        if file is None or file.filename == "":
+            message = "No file part found" if file is None else "No file selected"
+            if is_async:
+                return {"error": message}, 400
+            flash(message, "danger")
             return redirect(request.url)
 
-        # 5. Encode and prepare data
+        # 2. Save file into a fresh per-job workspace (uploads/jobs/<job id>/), so concurrent
+        # uploads never share an input or result path
         try:
-            le_dict = network_le if mode == "network" else web_le
-            
-            # Define features based on mode
-            network_features = [
-                "duration", "protocol_type", "service", "flag", "src_bytes", "dst_bytes",
-                "land", "wrong_fragment", "urgent", "hot", "num_failed_logins", "logged_in",
-                "num_compromised", "root_shell", "su_attempted", "num_root", "num_file_creations",
-                "num_shells", "num_access_files", "num_outbound_cmds", "is_host_login",
-                "is_guest_login", "count", "srv_count", "serror_rate", "srv_serror_rate",
-                "rerror_rate", "srv_rerror_rate", "same_srv_rate", "diff_srv_rate",
-                "srv_diff_host_rate", "dst_host_count", "dst_host_srv_count",
-                "dst_host_same_srv_rate", "dst_host_diff_srv_rate", "dst_host_same_src_port_rate",
-                "dst_host_srv_diff_host_rate", "dst_host_serror_rate", "dst_host_srv_serror_rate",
-                "dst_host_rerror_rate", "dst_host_srv_rerror_rate"
-            ]
-
-            web_features = [
-                "request_duration", "http_method", "user_agent_type", "url_length", "param_count",
-                "special_chars_query", "content_length", "cookie_size", "referrer_type",
-                "is_auth_header_present", "num_redirects", "response_code", "response_time",
-                "bot_score", "ip_reputation", "geo_location_id", "session_lifetime",
-                "db_query_count", "file_upload_count", "api_endpoint_id", "is_ajax",
-                "header_entropy", "payload_entropy", "malicious_signatures_count"
-            ]
-
-            all_features = network_features if mode == "network" else web_features
-            
-            # Check for missing features
-            missing_features = [f for f in all_features if f not in df.columns]
-            if missing_features:
-                hint = ""
-                # Check if it looks like the user uploaded the WRONG dataset type
-                if mode == "web" and "duration" in df.columns:
-                    hint = " (It looks like you uploaded a Network CSV to the Web module. Please switch to Network Analysis.)"
-                elif mode == "network" and "request_duration" in df.columns:
-                    hint = " (It looks like you uploaded a Web CSV to the Network module. Please switch to Web Analysis.)"
-                elif "Flow Duration" in df.columns or "Dst Port" in df.columns:
-                    hint = " (It looks like you are uploading a raw CIC-IDS2017 dataset. This demo ONLY works with the provided 'demo_network.csv' or 'demo_web.csv' files.)"
-                    
-                flash(f"Missing columns: {', '.join(missing_features)}.{hint}", "danger")
-                return redirect(request.url)
-            
-            # Select and reorder columns
-            df_to_process = df[all_features].copy()
-            
-            # Encode string columns using the same encoders used during training
-            for col in all_features:
-                if col in le_dict:
-                    le = le_dict[col]
-                    # Robust transform: map unknown labels to -1 instead of crashing (previously unseen labels error)
-                    # This ensures the application stays resilient to new/unseen categorical data
-                    df_to_process[col] = df_to_process[col].astype(str).map(
-                        lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                    )
-            
-            df_to_predict = df_to_process
-        except Exception as e:
-            flash(
-                f"Data processing error: {e}",
-                "danger"
-            )
+            workspace = workspaces.create(expected_bytes=request.content_length or 0)
+        except WorkspaceFullError as e:
+            if is_async:
+                return {"error": str(e)}, 507
+            flash(str(e), "danger")
             return redirect(request.url)
 
+        filepath = workspace.input_path(input_extension(mode))
+        try:
+            file.save(filepath)
+        except Exception:
+            workspaces.release(workspace.id)
+            raise
+
+        if is_async:
+            job = job_manager.submit(mode, filepath, owner=session["user"],
+                                     result_folder=workspace.path, job_id=workspace.id)
+            return {
+                "job_id": job.id,
+                "status_url": url_for("job_status", job_id=job.id),
+                "result_url": url_for("job_result", job_id=job.id),
+            }, 202
+
+        flash("PCAP capture uploaded successfully" if mode == "pcap" else "CSV file uploaded successfully", "success")
+
+        # 3. Stream the CSV through encode -> predict -> label in fixed-size chunks.
+        # Results are appended straight to the workspace's result_{mode}.parquet, so peak
+        # memory is bounded by the chunk size instead of the size of the upload.
+        job = job_manager.run(mode, filepath, owner=session["user"],
+                              result_folder=workspace.path, job_id=workspace.id)
+        if job.status == "failed":
+            flash(job.error, "danger")
+            return redirect(request.url)
 
+        # 4. Render result page (downloads and row pages point at this job)
+        return render_summary(
+            job.summary,
+            download_url=url_for("job_download", job_id=job.id),
+            rows_url=url_for("job_rows", job_id=job.id),
+        )
 
-        # 6. Predict
-        if mode == "network":
-            predictions = network_model.predict(df_to_predict)
-        elif mode == "web":
-            predictions = web_model.predict(df_to_predict)
-        else:
-            flash("Invalid analysis mode", "danger")
-            return redirect(url_for("dashboard"))
+    return render_template("upload.html", mode=mode)
 
-        # 7. Convert results
-        # Robust mapping: 0, "0", "normal", "benign" -> Benign. Everything else -> Attack.
-        def identify_attack(p):
-            s = str(p).strip().lower()
-            if s in ["normal", "0", "0.0", "benign"]:
-                return "Benign"
-            return "Attack"
-            
-        df["Prediction"] = [identify_attack(p) for p in predictions]
-        
-        # --- ACCURACY CALCULATION ---
-        accuracy_msg = None
-        if "label" in df.columns:
-            try:
-                # Convert predictions and ground truth to comparable binary format (0: normal, 1: attack)
-                def map_any_label(x):
-                    s = str(x).strip().lower()
-                    if s in ["normal", "0", "0.0", "benign"]:
-                        return 0
-                    return 1
-                
-                pred_binary = [map_any_label(p) for p in predictions]
-                ground_truth = df["label"].apply(map_any_label)
-                
-                acc = accuracy_score(ground_truth, pred_binary)
-                accuracy_msg = f"{acc * 100:.2f}%"
-                print(f"DEBUG: Accuracy calculated for {mode} upload: {accuracy_msg}")
-                print(f"DEBUG: Ground Truth Attacks: {sum(ground_truth)}, Predicted Attacks: {sum(pred_binary)}")
-            except Exception as e:
-                print(f"DEBUG: Accuracy calc failed: {e}")
-        # ----------------------------
-
-        # Add Severity Column for UI (High for Attack, Low for Benign)
-        def get_badge(pred):
-            s = str(pred).strip().lower()
-            if s in ["normal", "0", "0.0", "benign"]:
-                return '<span class="badge badge-success" style="font-size: 1rem; padding: 8px 12px; background-color: #00ff88; color: black;">Low</span>'
-            return '<span class="badge badge-danger" style="font-size: 1rem; padding: 8px 12px;">High</span>'
-
-        df["Severity"] = [get_badge(p) for p in predictions]
-
-        # 8. Save result CSV
-        result_path = os.path.join(upload_folder, f"result_{mode}.csv")
-        # Save a clean copy without HTML
-        df_clean = df.copy()
-        df_clean["Severity"] = ["Low" if str(p).strip().lower() in ["normal", "0", "0.0", "benign"] else "High" for p in predictions]
-        df_clean.to_csv(result_path, index=False)
-
-        pd.set_option('display.max_colwidth', None) # Ensure full content visibility
-        
-        # 9. Render result page
-        # Optimize: Don't render 125k rows in HTML, it crashes browser. Show top 500.
-        truncated_msg = ""
-        total_rows = len(df)
-        
-        # Calculate full counts for the cards and charts
-        if "Prediction" in df.columns:
-            # We use the 'Prediction' column we just created
-            total_attacks = (df["Prediction"] == "Attack").sum()
-            total_benign = total_rows - total_attacks
-        else:
-            total_attacks = 0
-            total_benign = 0
+def get_user_job(job_id):
+    """Look up a job, hiding other users' jobs."""
+    job = job_manager.get(job_id)
+    if job is None or job.owner != session.get("user"):
+        return None
+    return job
+
+def job_result_path(job):
+    """Stored result of a finished job, or None (failed, unfinished or workspace expired)."""
+    if job is None or job.status != "done" or not os.path.exists(job.summary["result_path"]):
+        return None
+    return job.summary["result_path"]
+
+# Job progress (rows processed, rows/sec, ETA)
+@app.route("/api/jobs/<job_id>")
+def job_status(job_id):
+    if "user" not in session:
+        return {"error": "Not logged in"}, 401
+    job = get_user_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    return job.to_dict()
+
+# Result page of a finished job
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    if "user" not in session:
+        return redirect(url_for("login"))
+    job = get_user_job(job_id)
+    if job is None:
+        flash("Analysis job not found (it may have expired)", "danger")
+        return redirect(url_for("dashboard"))
+    if job.status == "failed":
+        flash(job.error, "danger")
+        return redirect(url_for("upload", mode=job.mode))
+    if job.status != "done":
+        return render_template("upload.html", mode=job.mode, job_id=job.id)
+    return render_summary(
+        job.summary,
+        download_url=url_for("job_download", job_id=job.id),
+        rows_url=url_for("job_rows", job_id=job.id),
+    )
+
+def result_page(result_path):
+    """JSON page of a stored result: ?cursor=&limit=&sort=&order=asc|desc&prediction=&severity=&filter=col:op:value"""
+    try:
+        return result_browser.page(result_path, request.args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
 
-        if total_rows > 500:
-             truncated_msg = f" (Showing first 500 rows of {total_rows}. Download CSV for full results.)"
-             flash(f"Analysis complete! {truncated_msg}", "success")
-        
-        return render_template(
-            "result.html",
-            # Fix: Limit max_rows to 500 to prevent browser crash
-            tables=[df.head(500).to_html(classes="table table-striped", index=False, escape=False)],
-            mode=mode,
-            accuracy=accuracy_msg,  # Pass accuracy to template
-            total_rows=total_rows,  # Pass real row count
-            total_attacks=total_attacks,
-            total_benign=total_benign
-        )
+# Browse the user's latest result for a mode
+@app.route("/api/results/<mode>")
+def result_rows(mode):
+    if "user" not in session:
+        return {"error": "Not logged in"}, 401
+    result_path = job_result_path(job_manager.latest(session["user"], mode))
+    if result_path is None:
+        return {"error": "Result not available"}, 404
+    return result_page(result_path)
+
+# Browse the result of a finished job
+@app.route("/api/jobs/<job_id>/rows")
+def job_rows(job_id):
+    if "user" not in session:
+        return {"error": "Not logged in"}, 401
+    result_path = job_result_path(get_user_job(job_id))
+    if result_path is None:
+        return {"error": "Result not available"}, 404
+    return result_page(result_path)
+
+# Loaded model versions (hot-swapped when retrained models are published)
+@app.route("/api/models")
+def models_api():
+    if "user" not in session:
+        return {"error": "Not logged in"}, 401
+    return model_registry.stats()
+
+def scoring_authorized():
+    """Scoring API callers use an X-API-Key header (INTRUGUARD_API_KEYS) or a logged-in session."""
+    key = request.headers.get("X-API-Key")
+    if key and key in SCORING_API_KEYS:
+        return True
+    return "user" in session
+
+# Score records directly (SIEM pipelines): JSON batch/single record, or raw float32 rows
+@app.route("/api/score/<mode>", methods=["POST"])
+def score_api(mode):
+    if not scoring_authorized():
+        return {"error": "Unauthorized"}, 401
+    if mode not in FEATURES:
+        return {"error": f"Unknown mode {mode!r}"}, 404
+    bundle = model_registry.get(mode)
 
-    return render_template("upload.html", mode=mode)
+    try:
+        if request.mimetype == "application/octet-stream":
+            is_attack = score_binary(request.get_data(), mode, bundle)
+            if request.accept_mimetypes.best == "application/octet-stream":
+                return Response(attack_bytes(is_attack), mimetype="application/octet-stream",
+                                headers={"X-Model-Version": bundle.version})
+        else:
+            payload = request.get_json(silent=True)
+            if payload is None:
+                raise AnalysisError("Expected a JSON body (or application/octet-stream float32 rows)")
+            if isinstance(payload, dict) and isinstance(payload.get("record"), dict):
+                # Fast path: one record, no DataFrame
+                attack = score_record(payload["record"], mode, bundle)
+                return {
+                    "prediction": "Attack" if attack else "Benign",
+                    "severity": "High" if attack else "Low",
+                    "model_version": bundle.version,
+                }
+            is_attack = score_frame(records_frame(payload), mode, bundle)
+    except AnalysisError as e:
+        return {"error": str(e)}, 400
+
+    return {
+        **labels(is_attack),
+        "rows": len(is_attack),
+        "attacks": int(is_attack.sum()),
+        "model_version": bundle.version,
+    }
+
+# Feature order + categorical codes for binary scoring clients
+@app.route("/api/score/<mode>/schema")
+def score_schema_api(mode):
+    if not scoring_authorized():
+        return {"error": "Unauthorized"}, 401
+    if mode not in FEATURES:
+        return {"error": f"Unknown mode {mode!r}"}, 404
+    return schema(mode, model_registry.get(mode))
+
+# Download the result CSV of a finished job
+@app.route("/jobs/<job_id>/download")
+def job_download(job_id):
+    if "user" not in session:
+        return redirect(url_for("login"))
+    job = get_user_job(job_id)
+    result_path = job_result_path(job)
+    if result_path is None:
+        flash("Result not available", "danger")
+        return redirect(url_for("dashboard"))
+    return csv_export(result_path, f"result_{job.summary['mode']}.csv")
+
+def csv_export(result_path, filename):
+    """Stream a stored result as CSV; CSV is only produced when someone downloads it."""
+    return Response(
+        stream_with_context(iter_csv_export(result_path)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+# Download the user's latest result for a mode as CSV
+@app.route("/download_result/<mode>")
+def download_result(mode):
+    if "user" not in session:
+        return redirect(url_for("login"))
+    result_path = job_result_path(job_manager.latest(session["user"], mode))
+    if result_path is None:
+        flash("Result not available", "danger")
+        return redirect(url_for("dashboard"))
+    return csv_export(result_path, f"result_{mode}.csv")
 
 # Download result CSV
 @app.route("/download/<filename>")
@@ -307,13 +463,13 @@ def logout():
     return redirect(url_for("login"))
 
 # --- REAL-TIME PACKET MONITORING ---
-from scapy.all import sniff, IP, TCP, UDP, Ether, conf
-import threading
-import time
 import random
 
-# Global variable to store the latest captured packet
-latest_packet_data = {
+# scapy is slow to import and only needed by the sniffer: loaded by load_scapy()
+sniff = IP = TCP = UDP = conf = None
+
+# Placeholder shown until the first detection arrives
+WAITING_PACKET = {
     "timestamp": time.time(),
     "src_ip": "Scanning...",
     "dst_ip": "Scanning...",
@@ -322,61 +478,117 @@ latest_packet_data = {
     "prediction": "Benign"
 }
 
+# Recent detections: fixed-size, preallocated ring with sequence numbers.
+# Written only by the live scorer thread, read lock-free by the Flask handlers.
+detections = DetectionRing(LIVE_RING_CAPACITY)
+
+# Push stream fan-out: every SSE client follows the ring with its own cursor
+live_hub = StreamHub(detections)
+
+def publish_detection(event):
+    """Called by the live scorer worker for every scored connection"""
+    detections.append(event)
+
+# Live ML scoring: packets are micro-batched and scored by the network model on a
+# worker thread, so the scapy callback never waits on predict()
+live_scorer = LiveScorer(
+    lambda: model_registry.get("network"), publish_detection,
+    batch_size=LIVE_BATCH_SIZE, max_latency=LIVE_MAX_LATENCY_MS / 1000.0,
+    batch_seconds=metrics.histogram("intruguard_live_batch_seconds", "Time to score one live micro-batch"),
+)
+
+# Per-connection state: turns packets into NSL-KDD feature rows (count, serror_rate, dst_host_* ...)
+flow_tracker = FlowTracker(idle_timeout=FLOW_IDLE_TIMEOUT, max_flows=FLOW_MAX_ACTIVE)
+
+# Capture policy: BPF filter pushed into the kernel + protocol inclusion and sampling
+capture_policy = CapturePolicy(
+    bpf_filter=CAPTURE_BPF_FILTER,
+    protocols=CAPTURE_PROTOCOLS,
+    sample_rate=CAPTURE_SAMPLE_RATE,
+    sample_mode=CAPTURE_SAMPLE_MODE,
+)
+
+# Sniffer metrics. Only the callback count and latency are updated per packet; everything
+# the capture policy, flow tracker and live scorer already count is read at scrape time.
+PACKET_CALLBACKS = metrics.counter("intruguard_sniffer_packets_total", "Packets delivered to the sniffer callback")
+PACKET_CALLBACK_SECONDS = metrics.histogram(
+    "intruguard_sniffer_callback_seconds", "Time spent in the sniffer callback per packet")
+
 def process_packet(packet):
     """Callback function for scapy sniff"""
-    global latest_packet_data
-    
+    start = time.perf_counter()
+    PACKET_CALLBACKS.inc()
+    try:
+        track_packet(packet)
+    finally:
+        PACKET_CALLBACK_SECONDS.observe(time.perf_counter() - start)
+
+def track_packet(packet):
+    """Packet -> capture policy -> flow tracker -> live scorer queue"""
     if IP in packet:
-        src_ip = packet[IP].src
-        dst_ip = packet[IP].dst
-        length = len(packet)
+        ip = packet[IP]
+        info = {
+            "src_ip": ip.src,
+            "dst_ip": ip.dst,
+            "length": len(packet),
+            "fragment": bool(ip.frag) or "MF" in str(ip.flags),
+        }
         
         # Determine protocol
-        proto = "OTHER"
         if TCP in packet:
-            proto = "TCP"
+            info.update(protocol="TCP", sport=packet[TCP].sport, dport=packet[TCP].dport,
+                        tcp_flags=str(packet[TCP].flags), payload=len(packet[TCP].payload))
         elif UDP in packet:
-            proto = "UDP"
-        
-        # Basic Heuristic for "Prediction" (Visual Demo Only)
-        is_attack = "Benign"
-        if length > 1200 and random.random() < 0.3:
-             is_attack = "Attack"
-        elif random.random() < 0.05: # Random noise
-             is_attack = "Attack"
-             
-        latest_packet_data = {
-            "timestamp": time.time(),
-            "src_ip": src_ip,
-            "dst_ip": dst_ip,
-            "protocol": proto,
-            "length": length,
-            "prediction": is_attack
-        }
+            info.update(protocol="UDP", sport=packet[UDP].sport, dport=packet[UDP].dport,
+                        payload=len(packet[UDP].payload))
+        elif ip.proto == 1:
+            info.update(protocol="ICMP", payload=len(ip.payload))
+        else:
+            info.update(protocol="OTHER")
+
+        # Protocol inclusion + 1-in-N sampling (counted for /api/live_stats)
+        if not capture_policy.accept(info) or info["protocol"] == "OTHER":
+            return
+
+        # Every connection that finished with this packet becomes one model-ready row
+        for conn in flow_tracker.update(info, time.time()):
+            live_scorer.submit(conn["event"], conn["features"])
+
+def load_scapy():
+    """Import scapy on first use (it costs seconds, so web-only workers never pay for it)."""
+    global sniff, IP, TCP, UDP, conf
+    if sniff is None:
+        with startup_timer.stage("scapy import"):
+            from scapy.all import sniff as _sniff, IP as _IP, TCP as _TCP, UDP as _UDP, conf as _conf
+        IP, TCP, UDP, conf = _IP, _TCP, _UDP, _conf
+        sniff = _sniff  # set last: it doubles as the "loaded" flag
 
 def start_sniffer():
     """Background thread to sniff packets"""
+    try:
+        load_scapy()
+    except Exception as e:
+        print(f"scapy unavailable: {e}")
     # store=False prevents keeping all packets in memory (memory leak prevention)
     try:
         # Standard Sniff (needs Npcap on Windows)
-        print("Attempting standard L2 sniffing...")
-        sniff(prn=process_packet, store=False)
+        print(f"Attempting standard L2 sniffing (filter: {capture_policy.bpf()})...")
+        sniff(prn=process_packet, store=False, filter=capture_policy.bpf())
     except Exception as e:
         print(f"L2 Sniffer Error: {e}")
         try:
             # Fallback to Layer 3 sniffing (might work without Npcap for IP packets)
             print("Attempting L3 sniffing (conf.L3socket)...")
             conf.L3socket
-            sniff(prn=process_packet, store=False, iface=conf.L3socket)
+            sniff(prn=process_packet, store=False, iface=conf.L3socket, filter=capture_policy.bpf())
         except Exception as e2:
             print(f"L3 Sniffer Error: {e2}")
             # Fallback to Simulated Data if ALL sniffing fails (e.g. no admin/npcap)
             print("Falling back to simulation mode due to sniffing failures.")
-            global latest_packet_data
             protocols = ["TCP", "UDP", "HTTP", "HTTPS", "ICMP", "SSH", "FTP"]
             while True:
                 time.sleep(random.uniform(0.5, 2.0))
-                # update latest_packet_data manually to show *something* is broken or simulated
+                # publish a simulated detection to show *something* is broken or simulated
                 packet = {
                     "timestamp": time.time(),
                     "src_ip": f"SIMULATED (No Npcap)", 
@@ -385,24 +597,137 @@ def start_sniffer():
                     "length": random.randint(64, 1500),
                     "prediction": "Attack" if random.random() < 0.1 else "Benign"
                 }
-                latest_packet_data = packet
-
-# Start sniffer in a background thread
-# Daemon threads exit when the main program exits
-sniffer_thread = threading.Thread(target=start_sniffer, daemon=True)
-sniffer_thread.start()
+                publish_detection(packet)
+
+sniffer_thread = None
+_live_lock = threading.Lock()
+
+def start_live_services():
+    """Start live scoring and packet capture (idempotent).
+
+    Nothing live runs as a side effect of importing app.py: this is called by
+    start_services() (python app.py, desktop.py) or on the first visit to the
+    live monitor.
+    """
+    global sniffer_thread
+    with _live_lock:
+        if sniffer_thread is not None:
+            return
+        with startup_timer.stage("live scorer + sniffer threads"):
+            live_scorer.start()
+            # Daemon threads exit when the main program exits
+            sniffer_thread = threading.Thread(target=start_sniffer, name="sniffer", daemon=True)
+            sniffer_thread.start()
+
+def start_services(live=True):
+    """Explicit service start: warm the models up in the background and start the live pipeline."""
+    def warm_models():
+        with startup_timer.stage("models (background preload)"):
+            model_registry.preload().join()
+        startup_timer.report("Startup (models loaded)")
+
+    threading.Thread(target=warm_models, name="model-warmup", daemon=True).start()
+    if live:
+        start_live_services()
+    return startup_timer.report()
 
 # Live Monitor Page
 @app.route("/live_monitor")
 def live_monitor():
     if "user" not in session:
         return redirect(url_for("login"))
+    start_live_services()
     return render_template("live_monitor.html")
 
 @app.route("/api/live_traffic")
 def live_traffic_api():
     """Returns the latest captured packet"""
-    return latest_packet_data
+    return detections.latest() or WAITING_PACKET
+
+@app.route("/api/live_events")
+def live_events_api():
+    """Returns every detection after the client's cursor (?since=<seq>, omit for the most recent)"""
+    if "user" not in session:
+        return {"error": "Not logged in"}, 401
+    since = request.args.get("since", -1, type=int)
+    limit = min(request.args.get("limit", 1000, type=int), detections.capacity)
+    events, cursor, missed = detections.since(since, limit)
+    return {"events": events, "cursor": cursor, "missed": missed}
+
+@app.route("/api/live_stream")
+def live_stream_api():
+    """Server-Sent Events push stream of detections (batched frames, per-client drop policy)"""
+    if "user" not in session:
+        return {"error": "Not logged in"}, 401
+    # EventSource sends Last-Event-ID on reconnect so the client resumes where it stopped
+    cursor = request.headers.get("Last-Event-ID", type=int)
+    if cursor is None:
+        cursor = request.args.get("since", type=int)
+    stream = live_hub.stream(
+        cursor=cursor,
+        policy=request.args.get("policy", "drop_oldest"),
+        max_batch=min(request.args.get("max_batch", 200, type=int), detections.capacity),
+        max_backlog=min(request.args.get("max_backlog", 1000, type=int), detections.capacity),
+        interval=max(request.args.get("interval_ms", 250, type=int), 50) / 1000.0,
+    )
+    return Response(
+        stream_with_context(stream),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route("/api/live_stats")
+def live_stats_api():
+    """Live scoring throughput (connections/sec), batching, capture/sample/drop and flow-table counters"""
+    if "user" not in session:
+        return {"error": "Not logged in"}, 401
+    return {
+        **live_scorer.stats(),
+        "capture": capture_policy.stats(),
+        "flows": flow_tracker.stats(),
+        "stream": live_hub.stats(),
+        "running": sniffer_thread is not None,
+    }
+
+@app.route("/api/startup")
+def startup_api():
+    """Time spent initialising each subsystem"""
+    return {**startup_timer.report(), "models": model_registry.stats()}
+
+# Counters and gauges backed by the live pipeline's own counts (no hot-path cost)
+for name, help, fn in [
+    ("intruguard_capture_ip_packets_total", "IP packets checked by the capture policy", lambda: capture_policy.seen),
+    ("intruguard_capture_accepted_total", "Packets accepted by the capture policy", lambda: capture_policy.accepted),
+    ("intruguard_capture_filtered_total", "Packets excluded by protocol", lambda: capture_policy.filtered),
+    ("intruguard_capture_sampled_out_total", "Packets skipped by sampling", lambda: capture_policy.sampled_out),
+    ("intruguard_flow_connections_total", "Connections completed by the flow tracker", lambda: flow_tracker.completed),
+    ("intruguard_live_submitted_total", "Connections submitted for live scoring", lambda: live_scorer.submitted),
+    ("intruguard_live_scored_total", "Connections scored by the live scorer", lambda: live_scorer.scored),
+    ("intruguard_live_attacks_total", "Live connections predicted as attacks", lambda: live_scorer.attacks),
+    ("intruguard_live_dropped_total", "Connections dropped because the scoring queue was full", lambda: live_scorer.dropped),
+    ("intruguard_live_errors_total", "Live scoring batches that failed", lambda: live_scorer.errors),
+    ("intruguard_stream_events_dropped_total", "Detections dropped for slow SSE clients", lambda: live_hub.events_dropped),
+]:
+    metrics.counter(name, help).set_function(fn)
+
+for name, help, fn in [
+    ("intruguard_live_queue_depth", "Connections waiting to be scored", lambda: live_scorer.stats()["queue_depth"]),
+    ("intruguard_flow_active", "Connections currently tracked", lambda: flow_tracker.stats()["active_flows"]),
+    ("intruguard_stream_clients", "Connected SSE clients", lambda: live_hub.clients),
+    ("intruguard_jobs_active", "Analysis jobs queued or running", lambda: job_manager.active_count()),
+    ("intruguard_workspace_bytes", "Disk used by job workspaces", lambda: workspaces.usage()),
+]:
+    metrics.gauge(name, help).set_function(fn)
+
+@app.route("/metrics")
+def metrics_api():
+    """Prometheus-style scrape endpoint (text exposition format)"""
+    return Response(metrics.exposition(), content_type=METRICS_CONTENT_TYPE)
+
+startup_timer.mark("routes + live pipeline objects")
 
 if __name__ == "__main__":
+    # With the debug reloader only the serving child process starts the services
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_services()
     app.run(debug=True)
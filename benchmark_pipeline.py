@@ -0,0 +1,213 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from config import UPLOAD_FOLDER
+
+try:
+    import resource
+except ImportError:  # Not on Windows: peak memory comes from psutil there, if installed
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # Optional: without it (and without resource) peak RSS isn't reported
+    psutil = None
+
+# Default dataset sizes; 10M rows needs a few GB of disk for the generated CSV
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+MODES = ["network", "web"]
+BENCH_FOLDER = os.path.join(UPLOAD_FOLDER, "bench")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+
+# A stage regresses when it is this much slower than the baseline (and slower by
+# at least MIN_REGRESSION_SECONDS, so noise in millisecond stages isn't reported)
+TOLERANCE = 0.20
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None when it can't be measured.
+
+    POSIX: ru_maxrss (KB on Linux, bytes on macOS). Windows: psutil's peak
+    working set. Elsewhere psutil only knows the current RSS, which is used.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    return None
+
+
+def dataset_path(mode, rows, seed):
+    """Generated datasets are kept between runs: writing 10M rows takes longer than analysing them."""
+    from vectorized_datasets import write_dataset
+
+    path = os.path.join(BENCH_FOLDER, f"bench_{mode}_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(BENCH_FOLDER, exist_ok=True)
+        rate = write_dataset(mode, rows, path, seed)
+        print(f"INFO: Generated {path} ({rate:,.0f} rows/sec)")
+    return path
+
+
+def run_case(mode, rows, path):
+    """Analyse one dataset like an upload does and return its timings.
+
+    Runs in a fresh process (see run_cases), so peak RSS and the dedup memo
+    belong to this case alone.
+    """
+    from analysis import analyze_file
+    from result_browser import ResultIndex
+    from startup import StartupTimer
+
+    timer = StartupTimer()
+    with timer.stage("model_load"):
+        # The same lazily loaded, config-driven inference stack the app serves
+        from app import current_bundles
+        bundles = current_bundles(mode)
+    rss_before = peak_rss_mb()
+
+    result_folder = tempfile.mkdtemp(prefix="bench_")
+    try:
+        start = time.perf_counter()
+        summary = analyze_file(
+            path, mode,
+            predictors={name: b.predict for name, b in bundles.items()},
+            encoders={name: b.encoders for name, b in bundles.items()},
+            result_folder=result_folder,
+            timer=timer,
+        )
+        analysis_seconds = time.perf_counter() - start
+
+        # First page of the result table, as the browser requests it after an upload
+        with timer.stage("browse"):
+            ResultIndex(summary["result_path"]).page()
+        total_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(result_folder, ignore_errors=True)
+
+    stages = {name: round(seconds, 4) for name, seconds in timer.stages.items()}
+    return {
+        "mode": mode,
+        "rows": summary["total_rows"],
+        "analysis_seconds": round(analysis_seconds, 4),
+        "total_seconds": round(total_seconds, 4),
+        "rows_per_sec": round(summary["total_rows"] / analysis_seconds, 1) if analysis_seconds else None,
+        "stages": stages,
+        "stage_rows_per_sec": {
+            name: round(summary["total_rows"] / seconds, 1)
+            for name, seconds in stages.items() if seconds and name != "model_load"
+        },
+        "rss_after_model_load_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "accuracy": summary["accuracy"],
+        "dedup": summary.get("dedup"),
+    }
+
+
+def run_cases(modes, sizes, seed):
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for rows in sizes:
+        for mode in modes:
+            path = dataset_path(mode, rows, seed)
+            print(f"INFO: Benchmarking {mode} analysis of {rows:,} rows...")
+            # One process per case: ru_maxrss never goes down, and nothing is shared between cases
+            with ctx.Pool(1, maxtasksperchild=1) as pool:
+                result = pool.apply(run_case, (mode, rows, path))
+            print_result(result)
+            results.append(result)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+
+def print_result(result):
+    peak = f"{result['peak_rss_mb']} MB" if result["peak_rss_mb"] is not None else "n/a"
+    print(f"RESULT: {result['mode']} {result['rows']:,} rows in {result['analysis_seconds']:.2f}s "
+          f"= {result['rows_per_sec']:,.0f} rows/sec, peak RSS {peak}")
+    for name, seconds in result["stages"].items():
+        rate = result["stage_rows_per_sec"].get(name)
+        rate = f"{rate:>14,.0f} rows/sec" if rate else ""
+        print(f"  {name:<12} {seconds:10.4f}s {rate}")
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Regressions of `report` against `baseline`: a list of human-readable strings."""
+    previous = {(r["mode"], r["rows"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get((result["mode"], result["rows"]))
+        if old is None:
+            continue
+        case = f"{result['mode']} {result['rows']:,} rows"
+
+        if old.get("rows_per_sec") and result["rows_per_sec"] < old["rows_per_sec"] * (1 - tolerance):
+            regressions.append(f"{case}: throughput {result['rows_per_sec']:,.0f} rows/sec "
+                               f"(baseline {old['rows_per_sec']:,.0f})")
+        for name, seconds in result["stages"].items():
+            old_seconds = old.get("stages", {}).get(name)
+            if old_seconds is None:
+                continue
+            if seconds > old_seconds * (1 + tolerance) and seconds - old_seconds >= MIN_REGRESSION_SECONDS:
+                regressions.append(f"{case}: stage {name} {seconds:.3f}s (baseline {old_seconds:.3f}s)")
+        if old.get("peak_rss_mb") and result["peak_rss_mb"] and result["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{case}: peak RSS {result['peak_rss_mb']} MB (baseline {old['peak_rss_mb']} MB)")
+    return regressions
+
+
+def save_json(data, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    print(f"SAVED: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the upload/analysis pipeline stage by stage.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="dataset sizes in rows")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write this run's results to a JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown before a regression is flagged (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run_cases(args.modes, args.sizes, args.seed)
+    if args.output:
+        save_json(report, args.output)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if not regressions:
+            print(f"INFO: No regressions against {args.baseline}")
+    if args.save_baseline:
+        save_json(report, args.baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_pipeline.py [--sizes 10000 100000] [--modes network] [--save-baseline]
+    sys.exit(main())
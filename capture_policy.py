@@ -0,0 +1,84 @@
+import zlib
+
+SAMPLE_MODES = ("flow", "count")
+KNOWN_PROTOCOLS = ("tcp", "udp", "icmp")
+
+
+class CapturePolicy:
+    """What the live sniffer captures and how much of it gets analysed.
+
+    - `bpf_filter`: extra BPF expression, compiled into the kernel capture filter
+    - `protocols`: protocols to include; also compiled into the BPF filter, so
+      other traffic never reaches Python
+    - `sample_rate` N: keep 1 in N. "flow" mode hashes the connection 5-tuple
+      (both directions hash the same), so whole connections are kept or dropped
+      and the flow features stay consistent. "count" mode keeps every Nth packet.
+
+    accept() repeats the protocol check in Python for capture paths where the
+    kernel filter could not be applied. It also counts what was seen, filtered
+    and sampled out.
+    """
+
+    def __init__(self, bpf_filter="", protocols=KNOWN_PROTOCOLS, sample_rate=1, sample_mode="flow"):
+        self.bpf_filter = (bpf_filter or "").strip()
+        self.protocols = {p.strip().lower() for p in protocols if p.strip()}
+        unknown = self.protocols - set(KNOWN_PROTOCOLS)
+        if unknown:
+            raise ValueError(f"Unknown capture protocols: {', '.join(sorted(unknown))}")
+        if sample_mode not in SAMPLE_MODES:
+            raise ValueError(f"Unknown sample mode {sample_mode!r} (expected one of {SAMPLE_MODES})")
+        self.sample_rate = max(int(sample_rate), 1)
+        self.sample_mode = sample_mode
+
+        self.seen = 0
+        self.filtered = 0
+        self.sampled_out = 0
+        self.accepted = 0
+
+    def bpf(self):
+        """Kernel filter expression for scapy's sniff(filter=...), or None."""
+        parts = []
+        if self.protocols and self.protocols != set(KNOWN_PROTOCOLS):
+            parts.append(" or ".join(sorted(self.protocols)))
+        elif self.protocols:
+            parts.append("ip")
+        if self.bpf_filter:
+            parts.append(self.bpf_filter)
+        if not parts:
+            return None
+        return " and ".join(f"({p})" for p in parts)
+
+    def _flow_hash(self, info):
+        a = (info["src_ip"], info.get("sport") or 0)
+        b = (info["dst_ip"], info.get("dport") or 0)
+        lo, hi = (a, b) if a <= b else (b, a)
+        return zlib.crc32(f"{info['protocol']}|{lo[0]}|{lo[1]}|{hi[0]}|{hi[1]}".encode())
+
+    def accept(self, info):
+        """Decide whether a parsed packet goes on to flow tracking/scoring."""
+        self.seen += 1
+        if self.protocols and info["protocol"].lower() not in self.protocols:
+            self.filtered += 1
+            return False
+        if self.sample_rate > 1:
+            if self.sample_mode == "flow":
+                keep = self._flow_hash(info) % self.sample_rate == 0
+            else:
+                keep = self.seen % self.sample_rate == 0
+            if not keep:
+                self.sampled_out += 1
+                return False
+        self.accepted += 1
+        return True
+
+    def stats(self):
+        return {
+            "bpf_filter": self.bpf(),
+            "protocols": sorted(self.protocols),
+            "sample_rate": self.sample_rate,
+            "sample_mode": self.sample_mode,
+            "packets_seen": self.seen,
+            "packets_filtered": self.filtered,
+            "packets_sampled_out": self.sampled_out,
+            "packets_accepted": self.accepted,
+        }
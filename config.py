@@ -0,0 +1,88 @@
+import os
+
+# Central place for tunables. Every value can be overridden with an environment
+# variable so deployments don't need to edit code.
+
+UPLOAD_FOLDER = os.environ.get("INTRUGUARD_UPLOAD_FOLDER", "uploads")
+MODEL_FOLDER = os.environ.get("INTRUGUARD_MODEL_FOLDER", "models")
+
+# Rows read per chunk when analysing an upload. Peak memory is bounded by this,
+# not by the size of the uploaded file.
+CHUNK_SIZE = int(os.environ.get("INTRUGUARD_CHUNK_SIZE", "50000"))
+
+# Results with more rows than this get a "browse all rows" hint on the result page
+PREVIEW_ROWS = int(os.environ.get("INTRUGUARD_PREVIEW_ROWS", "500"))
+
+# Background analysis workers (uploads are queued as jobs and processed here)
+JOB_WORKERS = int(os.environ.get("INTRUGUARD_JOB_WORKERS", "2"))
+
+# Multi-core batch inference: number of worker processes that score row shards.
+# 0/1 keeps single-shot model.predict in the calling thread.
+INFERENCE_WORKERS = int(os.environ.get("INTRUGUARD_INFERENCE_WORKERS", "0"))
+INFERENCE_MIN_SHARD_ROWS = int(os.environ.get("INTRUGUARD_INFERENCE_MIN_SHARD_ROWS", "10000"))
+
+# Flattened NumPy forest (forest_compiler.py). It only beats sklearn's predict on
+# small batches and is a second copy of the trees, so it is off by default.
+# FLAT_FOREST_MAX_ROWS > 0 sends batches of up to that many rows (live
+# micro-batches, single records; 64 is a good value) to it, compiled on the first
+# such batch, and larger ones to sklearn. USE_FLAT_FOREST=1 scores every batch
+# with it (and serves the shared memory-mapped export, see MODEL_SERVING).
+USE_FLAT_FOREST = os.environ.get("INTRUGUARD_USE_FLAT_FOREST", "0") == "1"
+FLAT_FOREST_MAX_ROWS = int(os.environ.get("INTRUGUARD_FLAT_FOREST_MAX_ROWS", "0"))
+
+# Live sniffer scoring: packets are scored in micro-batches of up to LIVE_BATCH_SIZE,
+# and no packet waits longer than LIVE_MAX_LATENCY_MS for its batch to fill.
+LIVE_BATCH_SIZE = int(os.environ.get("INTRUGUARD_LIVE_BATCH_SIZE", "64"))
+LIVE_MAX_LATENCY_MS = int(os.environ.get("INTRUGUARD_LIVE_MAX_LATENCY_MS", "250"))
+
+# Live connection tracking: TCP flows idle longer than this are closed and scored;
+# the flow table never holds more than FLOW_MAX_ACTIVE open connections.
+FLOW_IDLE_TIMEOUT = float(os.environ.get("INTRUGUARD_FLOW_IDLE_TIMEOUT", "60"))
+FLOW_MAX_ACTIVE = int(os.environ.get("INTRUGUARD_FLOW_MAX_ACTIVE", "100000"))
+
+# Number of recent live detections kept for /api/live_events
+LIVE_RING_CAPACITY = int(os.environ.get("INTRUGUARD_LIVE_RING_CAPACITY", "8192"))
+
+# Live capture policy. The BPF expression and protocol list are compiled into the
+# kernel capture filter; sampling keeps 1 in CAPTURE_SAMPLE_RATE packets, either
+# per connection ("flow", 5-tuple hash) or per packet ("count").
+CAPTURE_BPF_FILTER = os.environ.get("INTRUGUARD_CAPTURE_FILTER", "")
+CAPTURE_PROTOCOLS = os.environ.get("INTRUGUARD_CAPTURE_PROTOCOLS", "tcp,udp,icmp").split(",")
+CAPTURE_SAMPLE_RATE = int(os.environ.get("INTRUGUARD_CAPTURE_SAMPLE_RATE", "1"))
+CAPTURE_SAMPLE_MODE = os.environ.get("INTRUGUARD_CAPTURE_SAMPLE_MODE", "flow")
+
+# Result storage: "auto" writes compressed Parquet when pyarrow is installed
+# (CSV is then only produced on download), "csv" forces plain CSV files.
+RESULT_FORMAT = os.environ.get("INTRUGUARD_RESULT_FORMAT", "auto")
+
+# Content-addressed cache of finished analyses (same upload + same models = instant
+# result). Kept under RESULT_CACHE_MAX_MB with least-recently-used eviction.
+RESULT_CACHE_ENABLED = os.environ.get("INTRUGUARD_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_FOLDER = os.environ.get("INTRUGUARD_RESULT_CACHE_FOLDER", os.path.join(UPLOAD_FOLDER, "cache"))
+RESULT_CACHE_MAX_MB = int(os.environ.get("INTRUGUARD_RESULT_CACHE_MAX_MB", "1024"))
+
+# Inference dedup: identical encoded rows are scored once per chunk, and a bounded
+# memo of recent feature vectors -> predictions is shared across requests.
+DEDUP_ENABLED = os.environ.get("INTRUGUARD_DEDUP", "1") == "1"
+DEDUP_MEMO_SIZE = int(os.environ.get("INTRUGUARD_DEDUP_MEMO_SIZE", "100000"))
+
+# Model serving for the flat forest: "shared" maps its export (models/<name>.forest.mmap)
+# read-only, so every worker process shares one copy of the arrays; "process" keeps
+# a private copy per process. It only applies where the flat forest is used: the
+# small-batch engine (FLAT_FOREST_MAX_ROWS) and USE_FLAT_FOREST=1. The sklearn model
+# can't run from the mapped arrays, so with the defaults every process unpickles its
+# own copy. USE_FLAT_FOREST=1 saves that memory but makes batch scoring 4-5x slower
+# (27 ms vs 13 ms for 2k rows, 278 ms vs 58 ms for 20k): only worth it when memory,
+# not upload throughput, is the limit.
+MODEL_SERVING = os.environ.get("INTRUGUARD_MODEL_SERVING", "shared")
+
+# Scoring REST API (/api/score/<mode>): clients authenticate with an X-API-Key
+# header holding one of these comma-separated keys (or a logged-in session).
+SCORING_API_KEYS = [k.strip() for k in os.environ.get("INTRUGUARD_API_KEYS", "").split(",") if k.strip()]
+
+# Per-job upload workspaces (UPLOAD_FOLDER/jobs/<job id>/ holds a job's input and
+# result). Workspaces unused for WORKSPACE_TTL_HOURS are deleted, and new uploads
+# are refused while all workspaces together use more than WORKSPACE_QUOTA_MB.
+WORKSPACE_FOLDER = os.environ.get("INTRUGUARD_WORKSPACE_FOLDER", os.path.join(UPLOAD_FOLDER, "jobs"))
+WORKSPACE_TTL_HOURS = float(os.environ.get("INTRUGUARD_WORKSPACE_TTL_HOURS", "24"))
+WORKSPACE_QUOTA_MB = int(os.environ.get("INTRUGUARD_WORKSPACE_QUOTA_MB", "10240"))
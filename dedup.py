@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class DedupStats:
+    """How much inference the dedup stage saved over one analysis."""
+
+    def __init__(self):
+        self.rows = 0
+        self.unique_rows = 0
+        self.memo_hits = 0
+        self.predicted = 0
+
+    @property
+    def ratio(self):
+        """Rows per distinct feature vector (10.0 = each vector repeats 10x on average).
+
+        Distinct vectors are counted per chunk; of those, `memo_hits` came from
+        the memo and `predicted` were sent to the model.
+        """
+        return self.rows / self.unique_rows if self.unique_rows else 1.0
+
+    def add(self, other):
+        self.rows += other.rows
+        self.unique_rows += other.unique_rows
+        self.memo_hits += other.memo_hits
+        self.predicted += other.predicted
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "unique_rows": self.unique_rows,
+            "memo_hits": self.memo_hits,
+            "predicted_rows": self.predicted,
+            "dedup_ratio": round(self.ratio, 2),
+        }
+
+
+def unique_rows(values):
+    """np.unique over whole rows: (first index of each unique row, inverse mapping).
+
+    Rows are viewed as single opaque byte strings (a void dtype), so the
+    comparison is one memcmp per row instead of column by column.
+    """
+    values = np.ascontiguousarray(values)
+    rows = values.view(np.dtype((np.void, values.dtype.itemsize * values.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first, inverse.ravel(), rows
+
+
+class DedupPredictor:
+    """Wraps a predict(frame) callable so each distinct feature vector is scored once.
+
+    Encoded rows are grouped with np.unique; only the unique rows that aren't in
+    the memo go to the model, and the predictions are scattered back with the
+    inverse index. The memo is a bounded LRU of recent vectors -> predictions
+    shared by all requests using this model, so repeated uploads and the endless
+    identical SYN-flood rows of NSL-KDD are mostly never re-scored.
+
+    Create a new DedupPredictor whenever the model changes; the memo is only
+    valid for the model it was filled by.
+    """
+
+    def __init__(self, predict, memo_size=100000):
+        self._predict = predict
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.totals = DedupStats()
+
+    def __call__(self, frame, stats=None):
+        return self.predict(frame, stats)
+
+    def predict(self, frame, stats=None):
+        """Predictions for every row of `frame`; counts go into `stats` if given."""
+        chunk_stats = DedupStats()
+        chunk_stats.rows = len(frame)
+        if not len(frame):
+            return self._predict(frame)
+
+        values = frame.to_numpy(dtype=np.float64)
+        first, inverse, rows = unique_rows(values)
+        chunk_stats.unique_rows = len(first)
+
+        keys = [rows[i].tobytes() for i in first]
+        unique_predictions = [None] * len(first)
+        missing = []
+        if self.memo_size:
+            with self._lock:
+                for n, key in enumerate(keys):
+                    prediction = self._memo.get(key)
+                    if prediction is None:
+                        missing.append(n)
+                    else:
+                        self._memo.move_to_end(key)
+                        unique_predictions[n] = prediction
+        else:
+            missing = list(range(len(first)))
+        chunk_stats.memo_hits = len(first) - len(missing)
+        chunk_stats.predicted = len(missing)
+
+        if missing:
+            todo = pd.DataFrame(values[first[missing]], columns=frame.columns)
+            predicted = np.asarray(self._predict(todo)).tolist()
+            for n, prediction in zip(missing, predicted):
+                unique_predictions[n] = prediction
+            if self.memo_size:
+                with self._lock:
+                    for n, prediction in zip(missing, predicted):
+                        self._memo[keys[n]] = prediction
+                    while len(self._memo) > self.memo_size:
+                        self._memo.popitem(last=False)
+
+        with self._lock:
+            self.totals.add(chunk_stats)
+        if stats is not None:
+            stats.add(chunk_stats)
+        return np.asarray(unique_predictions)[inverse]
+
+    def stats(self):
+        with self._lock:
+            return {**self.totals.to_dict(), "memo_entries": len(self._memo), "memo_size": self.memo_size}
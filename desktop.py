@@ -2,7 +2,7 @@ import webview
 import threading
 import time
 import sys
-from app import app
+from app import app, start_services
 
 # Function to run Flask in a separate thread
 def run_server():
@@ -10,6 +10,9 @@ def run_server():
     app.run(port=5000, debug=False)
 
 if __name__ == '__main__':
+    # Models warm up in the background and the sniffer starts; the window doesn't wait for either
+    start_services()
+
     # Start Flask server in a daemon thread
     t = threading.Thread(target=run_server)
     t.daemon = True
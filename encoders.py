@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+class CompiledEncoder:
+    """Hash-table version of a fitted LabelEncoder.
+
+    LabelEncoder.transform() has to be called once per cell (and `x in le.classes_`
+    is a linear scan), which is slower than the model itself on 100k+ row uploads.
+    Here the classes are compiled once into a pandas Index (hash lookup) and a whole
+    column is encoded in one vectorized pass. Unknown values keep mapping to -1.
+    """
+
+    def __init__(self, label_encoder):
+        self.classes_ = label_encoder.classes_
+        self._index = pd.Index(self.classes_)
+
+    def encode(self, values):
+        """Encode a Series / array of raw values. Returns an int64 numpy array."""
+        if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+            # Fast path: only look up each distinct category once, then broadcast via codes
+            cat = values.cat
+            category_codes = self._index.get_indexer(cat.categories.astype(str))
+            codes = cat.codes.to_numpy()
+            encoded = np.where(codes >= 0, category_codes[codes], -1)
+            return encoded.astype(np.int64)
+
+        values = pd.Series(values).astype(str)
+        return self._index.get_indexer(values).astype(np.int64)
+
+    def encode_one(self, value):
+        """Encode a single value (used on the per-record paths)."""
+        try:
+            return int(self._index.get_loc(str(value)))
+        except KeyError:
+            return -1
+
+
+class Vocabulary:
+    """Explicit category -> code mapping, saved in place of an extended LabelEncoder.
+
+    LabelEncoder.transform() / inverse_transform() assume classes_ is sorted
+    (they use searchsorted), but incremental_train.py appends new categories
+    after the existing ones so the codes the trees were trained on don't move.
+    Here classes_ stays in code order and values are looked up by hash. Same
+    interface as a fitted LabelEncoder; unseen values raise ValueError like it.
+    """
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def transform(self, values):
+        codes = pd.Index(self.classes_).get_indexer(np.asarray(values))
+        if (codes < 0).any():
+            unseen = pd.unique(np.asarray(values)[codes < 0])
+            raise ValueError(f"y contains previously unseen labels: {list(unseen)}")
+        return codes.astype(np.int64)
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes, dtype=np.int64)]
+
+
+def compile_encoders(le_dict):
+    """Compile a {column: LabelEncoder} dict (as saved in models/*_label_encoders.pkl)."""
+    return {col: CompiledEncoder(le) for col, le in le_dict.items()}
+
+
+def encode_frame(df, compiled):
+    """Encode every categorical column of `df` in place and return it.
+
+    Nullable integer columns (as stored in analysis results) become float64,
+    with NaN for missing values, like the models were trained on.
+    """
+    for col, enc in compiled.items():
+        if col in df.columns:
+            df[col] = enc.encode(df[col])
+    for col in df.columns[df.dtypes == "Int64"]:
+        df[col] = df[col].astype(np.float64)
+    return df
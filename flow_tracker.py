@@ -0,0 +1,345 @@
+from collections import OrderedDict, deque
+
+from analysis import NETWORK_FEATURES
+
+# Destination port -> NSL-KDD service name (anything else is "private"/"other")
+SERVICE_PORTS = {
+    20: "ftp_data", 21: "ftp", 22: "ssh", 23: "telnet", 25: "smtp", 53: "domain_u",
+    79: "finger", 80: "http", 110: "pop_3", 111: "sunrpc", 113: "auth", 119: "nntp",
+    123: "ntp_u", 143: "imap4", 179: "bgp", 389: "ldap", 443: "http_443", 8080: "http_8001",
+}
+
+# Services where an established, cleanly closed connection counts as "logged_in"
+LOGIN_SERVICES = {"ftp", "ftp_data", "ssh", "telnet", "smtp", "http", "http_443", "pop_3", "imap4"}
+
+SERROR_FLAGS = {"S0", "S1", "S2", "S3"}
+RERROR_FLAGS = {"REJ"}
+
+TIME_WINDOW = 2.0   # seconds, for count / srv_count / *_rate
+HOST_WINDOW = 100   # connections, for dst_host_*
+CLOSED_MEMORY = 4096  # recently closed connections remembered to swallow trailing packets
+CLOSED_LINGER = 4.0   # seconds (capture time) a closed 5-tuple keeps swallowing them
+
+
+def port_service(protocol, dport):
+    if protocol == "icmp":
+        return "eco_i"
+    if dport in SERVICE_PORTS:
+        return SERVICE_PORTS[dport]
+    return "private" if dport is not None and dport < 1024 else "other"
+
+
+class Connection:
+    """Per 5-tuple state. The originator is whoever sent the first packet."""
+
+    __slots__ = (
+        "src_ip", "dst_ip", "sport", "dport", "protocol", "start", "last",
+        "src_bytes", "dst_bytes", "packets", "wrong_fragment", "urgent",
+        "syn", "syn_ack", "fin_orig", "fin_resp", "rst_orig", "rst_resp",
+    )
+
+    def __init__(self, info, ts):
+        self.src_ip = info["src_ip"]
+        self.dst_ip = info["dst_ip"]
+        self.sport = info.get("sport")
+        self.dport = info.get("dport")
+        self.protocol = info["protocol"].lower()
+        self.start = ts
+        self.last = ts
+        self.src_bytes = 0
+        self.dst_bytes = 0
+        self.packets = 0
+        self.wrong_fragment = 0
+        self.urgent = 0
+        self.syn = self.syn_ack = False
+        self.fin_orig = self.fin_resp = False
+        self.rst_orig = self.rst_resp = False
+
+    def update(self, info, ts, from_orig):
+        self.last = ts
+        self.packets += 1
+        size = info.get("payload", info["length"])
+        if from_orig:
+            self.src_bytes += size
+        else:
+            self.dst_bytes += size
+        if info.get("fragment"):
+            self.wrong_fragment += 1
+
+        flags = info.get("tcp_flags") or ""
+        if not flags:
+            return
+        if "U" in flags:
+            self.urgent += 1
+        if "S" in flags:
+            if from_orig and "A" not in flags:
+                self.syn = True
+            elif not from_orig and "A" in flags:
+                self.syn_ack = True
+        if "F" in flags:
+            if from_orig:
+                self.fin_orig = True
+            else:
+                self.fin_resp = True
+        if "R" in flags:
+            if from_orig:
+                self.rst_orig = True
+            else:
+                self.rst_resp = True
+
+    @property
+    def finished(self):
+        return (self.fin_orig and self.fin_resp) or self.rst_orig or self.rst_resp
+
+    def flag(self):
+        """Bro/KDD-style connection state."""
+        if self.protocol != "tcp":
+            return "SF"
+        if not self.syn:
+            return "OTH"
+        if not self.syn_ack:
+            if self.rst_resp:
+                return "REJ"
+            if self.fin_orig:
+                return "SH"
+            if self.rst_orig:
+                return "RSTOS0"
+            return "S0"
+        if self.rst_orig:
+            return "RSTO"
+        if self.rst_resp:
+            return "RSTR"
+        if self.fin_orig and self.fin_resp:
+            return "SF"
+        return "S1"
+
+
+class _Counts:
+    """Multiset of window keys; keys that drop to zero are removed (bounded memory)."""
+
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, keys):
+        counts = self.counts
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+
+    def remove(self, keys):
+        counts = self.counts
+        for key in keys:
+            n = counts[key] - 1
+            if n:
+                counts[key] = n
+            else:
+                del counts[key]
+
+    def __getitem__(self, key):
+        return self.counts.get(key, 0)
+
+
+def _is_syn(info):
+    flags = info.get("tcp_flags") or ""
+    return "S" in flags and "A" not in flags
+
+
+def _rate(part, whole):
+    return round(part / whole, 2) if whole else 0.0
+
+
+class FlowTracker:
+    """Turns a packet stream into NSL-KDD feature rows, one per finished connection.
+
+    Connections are keyed by 5-tuple (both directions map to the same entry) in an
+    LRU-ordered dict. A connection finishes on FIN/FIN or RST, or when it has been
+    idle longer than its timeout; idle flows are swept from the LRU head on every
+    packet and the table is capped at `max_flows`, so memory stays bounded.
+
+    The KDD window features are kept incrementally: each finished connection adds
+    its keys to two sliding windows (last TIME_WINDOW seconds and last HOST_WINDOW
+    connections) and expired entries subtract theirs, so every row costs O(1)
+    amortized instead of rescanning the window.
+    """
+
+    def __init__(self, idle_timeout=60.0, datagram_timeout=10.0, max_flows=100000):
+        self.idle_timeout = idle_timeout
+        self.datagram_timeout = datagram_timeout
+        self.max_flows = max_flows
+        self._flows = OrderedDict()
+        self._time_window = deque()
+        self._time_counts = _Counts()
+        self._host_window = deque()
+        self._host_counts = _Counts()
+        self._window_clock = 0.0
+        # Recently closed 5-tuples -> close time: trailing ACKs/FINs must not open a new
+        # connection. Entries expire after CLOSED_LINGER seconds or on a fresh SYN.
+        self._closed = OrderedDict()
+
+        self.packets = 0
+        self.completed = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    def _timeout(self, conn):
+        return self.idle_timeout if conn.protocol == "tcp" else self.datagram_timeout
+
+    def update(self, info, ts):
+        """Feed one packet. Returns the feature records of connections that finished."""
+        self.packets += 1
+        finished = self.expire(ts)
+
+        protocol = info["protocol"].lower()
+        key = (protocol, info["src_ip"], info.get("sport"), info["dst_ip"], info.get("dport"))
+        conn = self._flows.get(key)
+        from_orig = True
+        if conn is None:
+            reverse = (protocol, info["dst_ip"], info.get("dport"), info["src_ip"], info.get("sport"))
+            conn = self._flows.get(reverse)
+            if conn is not None:
+                key, from_orig = reverse, False
+            else:
+                if key in self._closed:
+                    # The originator reusing its port for a new connection starts with a SYN
+                    if not _is_syn(info):
+                        return finished
+                    del self._closed[key]
+                elif reverse in self._closed:
+                    return finished
+                conn = self._flows[key] = Connection(info, ts)
+        self._flows.move_to_end(key)
+        conn.update(info, ts, from_orig)
+
+        if conn.finished:
+            del self._flows[key]
+            self._closed[key] = ts
+            if len(self._closed) > CLOSED_MEMORY:
+                self._closed.popitem(last=False)
+            finished.append(self._finish(conn))
+        elif len(self._flows) > self.max_flows:
+            _, oldest = self._flows.popitem(last=False)
+            self.evicted_capacity += 1
+            finished.append(self._finish(oldest))
+        return finished
+
+    def expire(self, now):
+        """Finish every connection that has been idle past its timeout (and forget old closed ones)."""
+        closed = self._closed
+        while closed:
+            key, closed_at = next(iter(closed.items()))
+            if now - closed_at < CLOSED_LINGER:
+                break
+            del closed[key]
+
+        finished = []
+        flows = self._flows
+        while flows:
+            key, conn = next(iter(flows.items()))
+            if now - conn.last < self._timeout(conn):
+                break
+            del flows[key]
+            self.evicted_idle += 1
+            finished.append(self._finish(conn))
+        return finished
+
+    def flush(self):
+        """Finish all open connections (end of a capture file)."""
+        finished = [self._finish(conn) for conn in self._flows.values()]
+        self._flows.clear()
+        return finished
+
+    def _finish(self, conn):
+        self.completed += 1
+        # Idle-evicted connections finish "late"; keep the window ordered in time
+        now = self._window_clock = max(conn.last, self._window_clock)
+        flag = conn.flag()
+        service = port_service(conn.protocol, conn.dport)
+        dst, sport = conn.dst_ip, conn.sport
+        serror = flag in SERROR_FLAGS
+        rerror = flag in RERROR_FLAGS
+
+        keys = [("h", dst), ("s", service), ("hs", dst, service)]
+        if serror:
+            keys += [("he", dst), ("se", service)]
+        if rerror:
+            keys += [("hr", dst), ("sr", service)]
+        host_keys = keys + [("hp", dst, sport)]
+
+        # Slide the 2-second window, then add this connection
+        window, counts = self._time_window, self._time_counts
+        while window and window[0][0] < now - TIME_WINDOW:
+            counts.remove(window.popleft()[1])
+        window.append((now, keys))
+        counts.add(keys)
+
+        # Slide the 100-connection window, then add this connection
+        host_window, host_counts = self._host_window, self._host_counts
+        if len(host_window) >= HOST_WINDOW:
+            host_counts.remove(host_window.popleft())
+        host_window.append(host_keys)
+        host_counts.add(host_keys)
+
+        count = counts[("h", dst)]
+        srv_count = counts[("s", service)]
+        same_srv = counts[("hs", dst, service)]
+        dst_host_count = host_counts[("h", dst)]
+        dst_host_srv_count = host_counts[("s", service)]
+        host_same_srv = host_counts[("hs", dst, service)]
+
+        row = dict.fromkeys(NETWORK_FEATURES, 0)
+        row.update({
+            "duration": int(conn.last - conn.start),
+            "protocol_type": conn.protocol if conn.protocol in ("tcp", "udp", "icmp") else "tcp",
+            "service": service,
+            "flag": flag,
+            "src_bytes": conn.src_bytes,
+            "dst_bytes": conn.dst_bytes,
+            "land": int(conn.src_ip == conn.dst_ip and conn.sport == conn.dport),
+            "wrong_fragment": conn.wrong_fragment,
+            "urgent": conn.urgent,
+            "logged_in": int(flag == "SF" and service in LOGIN_SERVICES),
+            "count": count,
+            "srv_count": srv_count,
+            "serror_rate": _rate(counts[("he", dst)], count),
+            "srv_serror_rate": _rate(counts[("se", service)], srv_count),
+            "rerror_rate": _rate(counts[("hr", dst)], count),
+            "srv_rerror_rate": _rate(counts[("sr", service)], srv_count),
+            "same_srv_rate": _rate(same_srv, count),
+            "diff_srv_rate": _rate(count - same_srv, count),
+            "srv_diff_host_rate": _rate(srv_count - same_srv, srv_count),
+            "dst_host_count": dst_host_count,
+            "dst_host_srv_count": dst_host_srv_count,
+            "dst_host_same_srv_rate": _rate(host_same_srv, dst_host_count),
+            "dst_host_diff_srv_rate": _rate(dst_host_count - host_same_srv, dst_host_count),
+            "dst_host_same_src_port_rate": _rate(host_counts[("hp", dst, sport)], dst_host_count),
+            "dst_host_srv_diff_host_rate": _rate(dst_host_srv_count - host_same_srv, dst_host_srv_count),
+            "dst_host_serror_rate": _rate(host_counts[("he", dst)], dst_host_count),
+            "dst_host_srv_serror_rate": _rate(host_counts[("se", service)], dst_host_srv_count),
+            "dst_host_rerror_rate": _rate(host_counts[("hr", dst)], dst_host_count),
+            "dst_host_srv_rerror_rate": _rate(host_counts[("sr", service)], dst_host_srv_count),
+        })
+
+        event = {
+            "timestamp": conn.last,
+            "src_ip": conn.src_ip,
+            "dst_ip": conn.dst_ip,
+            "sport": conn.sport,
+            "dport": conn.dport,
+            "protocol": conn.protocol.upper(),
+            "service": service,
+            "flag": flag,
+            "packets": conn.packets,
+            "length": conn.src_bytes + conn.dst_bytes,
+            "prediction": "Pending",
+        }
+        return {"event": event, "features": row}
+
+    def stats(self):
+        return {
+            "packets": self.packets,
+            "active_flows": len(self._flows),
+            "connections_completed": self.completed,
+            "evicted_idle": self.evicted_idle,
+            "evicted_capacity": self.evicted_capacity,
+        }
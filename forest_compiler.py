@@ -0,0 +1,365 @@
+import json
+import os
+import struct
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Rows scored per traversal block (rows x trees node-index matrix stays small)
+BLOCK_ROWS = 2048
+
+# Shared (memory-mapped) export: 8-byte header length, JSON header, then arrays
+SHARED_MAGIC = b"IGFOREST"
+SHARED_ALIGN = 64
+
+
+class FlatForest:
+    """A fitted RandomForest flattened into plain NumPy node arrays.
+
+    All trees are concatenated into one node table (feature, threshold, left,
+    right, per-class leaf probabilities) and traversed for a whole block of rows
+    and every tree at once, instead of walking sklearn's per-tree objects.
+    Leaves point to themselves, so a fixed `max_depth` number of vectorized steps
+    lands every (row, tree) pair on its leaf. Predictions match sklearn exactly:
+    rows are compared as float32 against float64 thresholds, leaf counts are
+    normalized per tree and averaged in tree order, like RandomForestClassifier.
+
+    It is only faster than sklearn's Cython traversal for small batches (up to
+    ~64 rows on the demo models); see route_small_batches().
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth,
+                 n_features, missing_go_to_left=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.missing_go_to_left = missing_go_to_left
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        arrays = [self.feature, self.threshold, self.left, self.right, self.value, self.roots]
+        if self.missing_go_to_left is not None:
+            arrays.append(self.missing_go_to_left)
+        return sum(a.nbytes for a in arrays)
+
+    def _leaves(self, X):
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if self.missing_go_to_left is not None:
+                go_left = np.where(np.isnan(x), self.missing_go_to_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X.to_numpy()
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the forest expects {self.n_features_in_}"
+            )
+
+        proba = np.zeros((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_ROWS):
+            leaves = self._leaves(X[start:start + BLOCK_ROWS])
+            block = proba[start:start + BLOCK_ROWS]
+            # Accumulate tree by tree (same summation order as sklearn)
+            for t in range(self.n_trees):
+                block += self.value[leaves[:, t]]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_forest(model):
+    """Flatten a fitted sklearn RandomForestClassifier / ExtraTreesClassifier."""
+    estimators = getattr(model, "estimators_", None)
+    if not estimators or not hasattr(estimators[0], "tree_"):
+        raise TypeError(f"{type(model).__name__} is not a fitted tree ensemble")
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise TypeError("Only single-output forests can be flattened")
+
+    features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+    has_missing = hasattr(estimators[0].tree_, "missing_go_to_left")
+    offset = 0
+    max_depth = 0
+    for est in estimators:
+        tree = est.tree_
+        n = tree.node_count
+        idx = np.arange(n, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        # Leaves loop back to themselves so every row can take max_depth steps
+        lefts.append(np.where(is_leaf, idx, tree.children_left).astype(np.int32) + offset)
+        rights.append(np.where(is_leaf, idx, tree.children_right).astype(np.int32) + offset)
+
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+        if has_missing:
+            missing.append(np.asarray(tree.missing_go_to_left, dtype=bool))
+
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    return FlatForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        classes=np.asarray(model.classes_),
+        max_depth=max_depth,
+        n_features=model.n_features_in_,
+        missing_go_to_left=np.concatenate(missing) if has_missing else None,
+    )
+
+
+def save_flat_forest(forest, path):
+    """Export a FlatForest as a single .npz file."""
+    arrays = {
+        "feature": forest.feature,
+        "threshold": forest.threshold,
+        "left": forest.left,
+        "right": forest.right,
+        "value": forest.value,
+        "roots": forest.roots,
+        "classes": forest.classes_,
+        "meta": np.array([forest.max_depth, forest.n_features_in_]),
+    }
+    if forest.missing_go_to_left is not None:
+        arrays["missing_go_to_left"] = forest.missing_go_to_left
+    np.savez(path, **arrays)
+
+
+def load_flat_forest(path):
+    with np.load(path, allow_pickle=True) as data:
+        max_depth, n_features = data["meta"]
+        return FlatForest(
+            feature=data["feature"],
+            threshold=data["threshold"],
+            left=data["left"],
+            right=data["right"],
+            value=data["value"],
+            roots=data["roots"],
+            classes=data["classes"],
+            max_depth=max_depth,
+            n_features=n_features,
+            missing_go_to_left=data["missing_go_to_left"] if "missing_go_to_left" in data.files else None,
+        )
+
+
+def flat_forest_path(model_path):
+    return os.path.splitext(model_path)[0] + ".forest.npz"
+
+
+def shared_forest_path(model_path):
+    return os.path.splitext(model_path)[0] + ".forest.mmap"
+
+
+def _forest_arrays(forest):
+    arrays = {
+        "feature": forest.feature,
+        "threshold": forest.threshold,
+        "left": forest.left,
+        "right": forest.right,
+        "value": forest.value,
+        "roots": forest.roots,
+    }
+    if forest.missing_go_to_left is not None:
+        arrays["missing_go_to_left"] = forest.missing_go_to_left
+    return arrays
+
+
+def save_shared_forest(forest, path):
+    """Export a FlatForest as one file whose arrays can be memory-mapped in place.
+
+    Every array is stored raw at a 64-byte aligned offset described by a small
+    JSON header, so load_shared_forest() maps them without reading or copying:
+    all worker processes serving the model share the same page-cache pages.
+    The file is written under a temp name and renamed, so processes that still
+    map the previous version keep a valid (unlinked) file.
+    """
+    arrays = {name: np.ascontiguousarray(a) for name, a in _forest_arrays(forest).items()}
+    classes = forest.classes_
+    header = {
+        "max_depth": forest.max_depth,
+        "n_features": forest.n_features_in_,
+        "classes": classes.tolist(),
+        "classes_dtype": classes.dtype.str if classes.dtype != object else "O",
+    }
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset += -(-a.nbytes // SHARED_ALIGN) * SHARED_ALIGN
+    header["arrays"] = layout
+    # Pad the header so the array data starts aligned; offsets are relative to that start
+    header_bytes = json.dumps(header).encode()
+    prefix = len(SHARED_MAGIC) + 8
+    data_start = -(-(prefix + len(header_bytes)) // SHARED_ALIGN) * SHARED_ALIGN
+    header_bytes = header_bytes.ljust(data_start - prefix)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(SHARED_MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for name, a in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(a.tobytes())
+    os.replace(tmp, path)
+
+
+def load_shared_forest(path):
+    """Map a save_shared_forest() export read-only (np.memmap, nothing copied)."""
+    with open(path, "rb") as f:
+        if f.read(len(SHARED_MAGIC)) != SHARED_MAGIC:
+            raise ValueError(f"{path} is not a shared forest export")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    data_start = len(SHARED_MAGIC) + 8 + header_len
+
+    arrays = {
+        name: np.memmap(path, mode="r", dtype=np.dtype(spec["dtype"]), shape=tuple(spec["shape"]),
+                        offset=data_start + spec["offset"])
+        for name, spec in header["arrays"].items()
+    }
+    classes_dtype = object if header["classes_dtype"] == "O" else np.dtype(header["classes_dtype"])
+    return FlatForest(
+        classes=np.asarray(header["classes"], dtype=classes_dtype),
+        max_depth=header["max_depth"],
+        n_features=header["n_features"],
+        missing_go_to_left=arrays.pop("missing_go_to_left", None),
+        **arrays,
+    )
+
+
+def map_shared_forest(model_path, model=None):
+    """Map the shared export of `model_path`, writing it first if it is missing or stale.
+
+    `model` is the already loaded model, if any (otherwise the pickle is only
+    unpickled to write the export). Returns None when the model can't be
+    exported or the export can't be mapped.
+    """
+    import joblib
+
+    export_path = shared_forest_path(model_path)
+    if not os.path.exists(export_path) or os.path.getmtime(export_path) < os.path.getmtime(model_path):
+        try:
+            save_shared_forest(compile_forest(model if model is not None else joblib.load(model_path)), export_path)
+        except (TypeError, ValueError, OSError) as e:
+            print(f"DEBUG: No shared forest for {model_path} ({e})")
+            return None
+
+    try:
+        forest = load_shared_forest(export_path)
+    except (ValueError, OSError, KeyError) as e:
+        print(f"DEBUG: Shared forest {export_path} unusable ({e})")
+        return None
+    print(f"DEBUG: Mapped shared forest {export_path} ({forest.nbytes / 1e6:.1f} MB, read-only)")
+    return forest
+
+
+def load_serving_model(model_path, shared=True):
+    """What a serving process loads for `model_path`.
+
+    With `shared`, a current memory-mapped export (not older than the pickle)
+    is mapped instead of unpickling the model, so N worker processes hold one
+    copy of the trees between them. A missing or stale export is written by
+    the first process that needs it. Otherwise the pickle is loaded as before.
+    """
+    import joblib
+
+    forest = map_shared_forest(model_path) if shared else None
+    return forest if forest is not None else joblib.load(model_path)
+
+
+def route_small_batches(load_engine, predict, max_rows):
+    """predict(X) that uses the flat engine for batches of up to `max_rows` rows only.
+
+    The engine is built by `load_engine()` on the first small batch, so a
+    process that only scores large batches never holds a second copy of the trees.
+    """
+    engine = None
+    lock = threading.Lock()
+
+    def route(X):
+        nonlocal engine
+        if len(X) > max_rows:
+            return predict(X)
+        if engine is None:
+            with lock:
+                if engine is None:
+                    engine = load_engine()
+        return engine.predict(X)
+    return route
+
+
+def load_inference_engine(model, model_path, shared=False):
+    """Return the flattened engine for `model`, or `model` itself if it can't be flattened.
+
+    With `shared`, the memory-mapped export is used (one copy of the arrays
+    for all processes, see map_shared_forest). Otherwise uses the exported
+    models/<name>.forest.npz when it is newer than the pickle, or flattens the
+    loaded model in memory.
+    """
+    if isinstance(model, FlatForest):
+        return model  # Already flat (e.g. mapped by load_serving_model)
+    if shared:
+        forest = map_shared_forest(model_path, model)
+        if forest is not None:
+            return forest
+    export_path = flat_forest_path(model_path)
+    try:
+        if os.path.exists(export_path) and os.path.getmtime(export_path) >= os.path.getmtime(model_path):
+            return load_flat_forest(export_path)
+        return compile_forest(model)
+    except (TypeError, ValueError, OSError, KeyError) as e:
+        print(f"DEBUG: Flattened forest unavailable for {model_path} ({e}); using model.predict")
+        return model
+
+
+if __name__ == "__main__":
+    # Usage: python forest_compiler.py models/web_model.pkl [verify.csv mode]
+    import joblib
+
+    model_path = sys.argv[1]
+    model = joblib.load(model_path)
+    forest = compile_forest(model)
+    out_path = flat_forest_path(model_path)
+    save_flat_forest(forest, out_path)
+    save_shared_forest(forest, shared_forest_path(model_path))
+    print(f"SAVED: {out_path} + {shared_forest_path(model_path)} ({forest.n_trees} trees, "
+          f"{len(forest.feature)} nodes, depth {forest.max_depth}, {forest.nbytes / 1e6:.1f} MB)")
+
+    if len(sys.argv) > 3:
+        from analysis import FEATURES
+        from encoders import compile_encoders, encode_frame
+
+        csv_path, mode = sys.argv[2], sys.argv[3]
+        encoders = compile_encoders(joblib.load(model_path.replace("_model.pkl", "_label_encoders.pkl")))
+        X = encode_frame(pd.read_csv(csv_path)[FEATURES[mode]], encoders)
+        mismatches = int((forest.predict(X) != model.predict(X)).sum())
+        print(f"VERIFY: {mismatches} mismatches against sklearn on {len(X)} rows")
@@ -0,0 +1,166 @@
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.tree._tree import Tree
+
+from analysis import FEATURES, benign_mask
+from config import MODEL_FOLDER
+from encoders import Vocabulary, compile_encoders, encode_frame
+from model_registry import publish_bundle
+from schema import sniff_schema
+
+# Trees trained per new batch, and the most trees the forest keeps (oldest dropped first)
+TREES_PER_BATCH = 50
+MAX_TREES = 300
+
+
+def extend_encoders(label_encoders, frame):
+    """Add categories seen in `frame` for the first time to the fitted encoders.
+
+    New values are appended after the existing classes, so every value keeps
+    the code the trees were trained on and unseen values (like a new `service`)
+    get the next free code. An extended encoder is replaced by an
+    encoders.Vocabulary: a LabelEncoder with unsorted classes_ would silently
+    return wrong codes from transform(). Values are compared as strings, like
+    the app's CompiledEncoder does. Returns {column: [new values]}.
+    """
+    added = {}
+    for col, le in list(label_encoders.items()):
+        if col not in frame.columns:
+            continue
+        known = set(map(str, le.classes_))
+        new = [v for v in pd.unique(frame[col].astype(str)) if v not in known]
+        if new:
+            new_values = np.asarray(new, dtype=object) if le.classes_.dtype == object else np.asarray(new)
+            label_encoders[col] = Vocabulary(np.concatenate([le.classes_, new_values]))
+            added[col] = new
+    return added
+
+
+def _align_tree(estimator, tree_classes, classes):
+    """Re-index a fitted tree's class columns from `tree_classes` to `classes`.
+
+    Trees of a forest store one value column per forest class. Trees trained on
+    a batch that lacked some classes get zero columns for them, so old and new
+    trees can vote in one forest.
+    """
+    positions = np.searchsorted(classes, tree_classes)
+    if len(tree_classes) == len(classes) and np.array_equal(positions, np.arange(len(classes))):
+        return
+    tree = estimator.tree_
+    state = tree.__getstate__()
+    values = np.zeros((tree.node_count, tree.n_outputs, len(classes)), dtype=state["values"].dtype)
+    values[:, :, positions] = state["values"]
+    state["values"] = values
+
+    aligned = Tree(tree.n_features, np.array([len(classes)], dtype=np.intp), tree.n_outputs)
+    aligned.__setstate__(state)
+    estimator.tree_ = aligned
+    estimator.n_classes_ = len(classes)
+    estimator.classes_ = np.arange(len(classes), dtype=np.float64)
+
+
+def add_trees(model, X, y, n_trees=TREES_PER_BATCH, max_trees=MAX_TREES):
+    """Warm-start `model` (a fitted random forest) with `n_trees` trees fitted on X, y only.
+
+    The cost depends on the size of the new batch, not on all data seen so far.
+    Class sets are merged (new attack labels become new classes), and the
+    forest is bounded to the newest `max_trees` trees.
+    """
+    if not hasattr(model, "estimators_") or not hasattr(model.estimators_[0], "tree_"):
+        raise TypeError(f"{type(model).__name__} is not a fitted random forest")
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise TypeError("Only single-output forests can be trained incrementally")
+
+    batch_model = clone(model).set_params(n_estimators=n_trees, warm_start=False, oob_score=False)
+    batch_model.fit(X, y)
+
+    classes = np.union1d(model.classes_, batch_model.classes_)
+    for forest in (model, batch_model):
+        for estimator in forest.estimators_:
+            _align_tree(estimator, forest.classes_, classes)
+
+    model.estimators_ = (list(model.estimators_) + list(batch_model.estimators_))[-max_trees:]
+    model.n_estimators = len(model.estimators_)
+    model.classes_ = classes
+    model.n_classes_ = len(classes)
+    for stale in ("oob_score_", "oob_decision_function_"):
+        if hasattr(model, stale):
+            delattr(model, stale)
+    return model
+
+
+def load_batch(filepath, mode):
+    """Read a labelled batch (headered CSV or headerless NSL-KDD) with the app's schema sniffing."""
+    schema = sniff_schema(filepath)
+    if schema.mode != mode:
+        raise ValueError(f"{filepath} looks like a {schema.kind} dataset, not {mode}")
+    frame = pd.read_csv(filepath, **schema.read_csv_kwargs())
+    if "label" not in frame.columns:
+        raise ValueError(f"{filepath} has no label column")
+    return frame
+
+
+def batch_labels(labels, model):
+    """Labels in the model's vocabulary: binary (0 normal / 1 attack) models get 0/1."""
+    if set(np.asarray(model.classes_).tolist()) <= {0, 1}:
+        return (~benign_mask(labels)).astype(int)
+    return labels.astype(str).str.strip().to_numpy()
+
+
+def train_increment(mode, filepath, n_trees=TREES_PER_BATCH, max_trees=MAX_TREES,
+                    model_folder=MODEL_FOLDER, holdout=0.1):
+    """Add trees for one new labelled batch to the `mode` model and publish it."""
+    model_path = os.path.join(model_folder, f"{mode}_model.pkl")
+    encoders_path = os.path.join(model_folder, f"{mode}_label_encoders.pkl")
+    model = joblib.load(model_path)
+    label_encoders = joblib.load(encoders_path)
+
+    frame = load_batch(filepath, mode)
+    print(f"INFO: Loaded {len(frame)} new labelled rows from {filepath}")
+
+    features = list(getattr(model, "feature_names_in_", FEATURES[mode]))
+    for col, values in extend_encoders(label_encoders, frame).items():
+        print(f"INFO: New {col} categories: {values}")
+
+    X = encode_frame(frame[features].copy(), compile_encoders(label_encoders))
+    y = batch_labels(frame["label"], model)
+
+    X_val = y_val = None
+    if holdout and len(X) >= 20:
+        X, X_val, y, y_val = train_test_split(X, y, test_size=holdout, random_state=42)
+        print(f"RESULT: Accuracy on new data before update: {model.score(X_val, y_val) * 100:.2f}%")
+
+    start = time.perf_counter()
+    trees_before = len(model.estimators_)
+    add_trees(model, X, y, n_trees, max_trees)
+    print(f"DONE: Trained {n_trees} trees on {len(X)} rows in {time.perf_counter() - start:.2f}s "
+          f"({trees_before} -> {len(model.estimators_)} trees, max {max_trees})")
+    if X_val is not None:
+        print(f"RESULT: Accuracy on new data after update: {model.score(X_val, y_val) * 100:.2f}%")
+
+    return publish_bundle(model, label_encoders, model_path, encoders_path)
+
+
+if __name__ == "__main__":
+    # Usage: python incremental_train.py network new_day.csv [--trees 50] [--max-trees 300]
+    parser = argparse.ArgumentParser(description="Add trees trained on a new labelled batch to a published model.")
+    parser.add_argument("mode", choices=list(FEATURES))
+    parser.add_argument("csv", help="new labelled batch (same schema as the training data)")
+    parser.add_argument("--trees", type=int, default=TREES_PER_BATCH, help="trees trained on this batch")
+    parser.add_argument("--max-trees", type=int, default=MAX_TREES, help="forest size bound (oldest trees dropped)")
+    parser.add_argument("--holdout", type=float, default=0.1, help="share of the batch kept for before/after accuracy")
+    args = parser.parse_args()
+
+    try:
+        train_increment(args.mode, args.csv, args.trees, args.max_trees, holdout=args.holdout)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis import AnalysisError
+
+
+def estimate_rows(filepath, sample_bytes=64 * 1024):
+    """Rough row count for progress/ETA: file size / average line length of the first KB."""
+    try:
+        size = os.path.getsize(filepath)
+        with open(filepath, "rb") as f:
+            sample = f.read(sample_bytes)
+    except OSError:
+        return None
+    lines = sample.count(b"\n")
+    if not lines:
+        return None
+    if len(sample) >= size:
+        return lines
+    return int(size / (len(sample) / lines))
+
+
+class AnalysisJob:
+    """State of one background analysis. Mutated only by its worker thread."""
+
+    def __init__(self, mode, filepath, owner=None, result_folder=None, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.mode = mode
+        self.filepath = filepath
+        self.owner = owner
+        self.result_folder = result_folder
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.rows_processed = 0
+        self.estimated_rows = None
+        self.summary = None
+        self.error = None
+
+    def update_progress(self, rows_processed):
+        self.rows_processed = rows_processed
+
+    def to_dict(self):
+        """JSON-friendly progress report (rows processed, rows/sec, ETA)."""
+        now = self.finished_at or time.time()
+        elapsed = (now - self.started_at) if self.started_at else 0.0
+        rows_per_sec = self.rows_processed / elapsed if elapsed > 0 else 0.0
+
+        eta = None
+        if self.status == "running" and rows_per_sec > 0 and self.estimated_rows:
+            eta = max(self.estimated_rows - self.rows_processed, 0) / rows_per_sec
+        elif self.status == "done":
+            eta = 0.0
+
+        return {
+            "job_id": self.id,
+            "mode": self.summary["mode"] if self.summary else self.mode,
+            "status": self.status,
+            "rows_processed": self.rows_processed,
+            "estimated_rows": self.estimated_rows,
+            "rows_per_sec": round(rows_per_sec, 1),
+            "elapsed_seconds": round(elapsed, 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs analyses on a worker pool so uploads don't block Flask workers.
+
+    `run` is called as run(job) on a pool thread and must return the analysis
+    summary. Finished jobs are kept (most recent `max_jobs`) so their results can
+    still be fetched.
+    """
+
+    def __init__(self, run, max_workers=2, max_jobs=100):
+        self._run = run
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def _add(self, mode, filepath, owner, result_folder, job_id):
+        job = AnalysisJob(mode, filepath, owner, result_folder, job_id)
+        job.estimated_rows = estimate_rows(filepath)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        return job
+
+    def submit(self, mode, filepath, owner=None, result_folder=None, job_id=None):
+        """Queue an analysis; returns the job right away."""
+        job = self._add(mode, filepath, owner, result_folder, job_id)
+        self._pool.submit(self._execute, job)
+        return job
+
+    def run(self, mode, filepath, owner=None, result_folder=None, job_id=None):
+        """Run an analysis in the calling thread; returns the finished (done or failed) job."""
+        job = self._add(mode, filepath, owner, result_folder, job_id)
+        self._execute(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self, owner, mode):
+        """Most recent finished job of `owner` whose result has this mode, or None."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in reversed(jobs):
+            if job.owner == owner and job.status == "done" and job.summary["mode"] == mode:
+                return job
+        return None
+
+    def active_count(self):
+        """Jobs queued or running."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def _trim(self):
+        # Forget the oldest finished jobs once we're over the limit
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].status in ("done", "failed"):
+                del self._jobs[job_id]
+
+    def _execute(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.summary = self._run(job)
+            job.rows_processed = job.summary["total_rows"]
+            job.status = "done"
+        except AnalysisError as e:
+            job.error = str(e)
+            job.status = "failed"
+        except Exception as e:
+            print(f"DEBUG: Analysis job {job.id} crashed: {e}")
+            job.error = f"Analysis failed: {e}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            # The per-job input copy is no longer needed once analysed
+            try:
+                os.remove(job.filepath)
+            except OSError:
+                pass
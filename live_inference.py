@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+from analysis import NETWORK_FEATURES, benign_mask
+from encoders import encode_frame
+
+
+class LiveScorer:
+    """Scores live connections with the network model in micro-batches.
+
+    The capture callback only calls submit(), which never blocks: if the queue is
+    full the event is dropped and counted. A separate worker thread drains the
+    queue into batches of up to `batch_size` events (or whatever arrived within
+    `max_latency` seconds of the first one), runs one predict() per batch and
+    hands every scored event to `on_result`.
+
+    `model` is called once per batch and returns the model bundle to score
+    with (anything with .predict and .encoders), so a hot-swapped model is
+    picked up on the next batch. `batch_seconds`, if given, is a histogram
+    (see metrics.py) observing how long each batch takes to score.
+    """
+
+    def __init__(self, model, on_result, batch_size=64, max_latency=0.25, queue_size=10000, batch_seconds=None):
+        self.model = model
+        self.batch_seconds = batch_seconds
+        self.on_result = on_result
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.attacks = 0
+        self.batches = 0
+        self.errors = 0
+        # (time, scored) samples, at most one per second: the rate covers the last ~5s
+        self._rate_samples = deque([(time.monotonic(), 0)], maxlen=6)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-scorer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def submit(self, event, features):
+        """Queue one event for scoring. Called from the capture thread; never blocks."""
+        self.submitted += 1
+        try:
+            self._queue.put_nowait((event, features))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _collect_batch(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                self._score(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"DEBUG: Live scoring failed for batch of {len(batch)}: {e}")
+
+    def _score(self, batch):
+        start = time.perf_counter()
+        events = [event for event, _ in batch]
+        frame = pd.DataFrame([features for _, features in batch], columns=NETWORK_FEATURES)
+        bundle = self.model()
+        predictions = bundle.predict(encode_frame(frame, bundle.encoders))
+        is_attack = ~benign_mask(predictions)
+
+        for event, attack in zip(events, is_attack):
+            event["prediction"] = "Attack" if attack else "Benign"
+            self.on_result(event)
+
+        self.batches += 1
+        self.scored += len(batch)
+        self.attacks += int(is_attack.sum())
+        if self.batch_seconds is not None:
+            self.batch_seconds.observe(time.perf_counter() - start)
+
+    def _current_rate(self):
+        """Connections scored per second over (roughly) the last 5 seconds, up to now.
+
+        Sampled when stats are read, not per batch, so it falls to 0 once
+        traffic stops instead of repeating the last busy window.
+        """
+        now = time.monotonic()
+        scored = self.scored
+        if now - self._rate_samples[-1][0] >= 1.0:
+            self._rate_samples.append((now, scored))
+        since, scored_then = self._rate_samples[0]
+        return (scored - scored_then) / (now - since) if now > since else 0.0
+
+    def stats(self):
+        return {
+            "connections_submitted": self.submitted,
+            "connections_scored": self.scored,
+            "connections_dropped": self.dropped,
+            "attacks": self.attacks,
+            "batches": self.batches,
+            "errors": self.errors,
+            "avg_batch_size": round(self.scored / self.batches, 1) if self.batches else 0.0,
+            "queue_depth": self._queue.qsize(),
+            "connections_per_sec": round(self._current_rate(), 1),
+            "batch_size": self.batch_size,
+            "max_latency_ms": int(self.max_latency * 1000),
+        }
@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+
+POLICIES = ("drop_oldest", "lossless")
+
+
+class StreamHub:
+    """Fans live detections out to Server-Sent Events clients.
+
+    Clients don't get their own queues fed by the sniffer: each one keeps a
+    cursor into the shared DetectionRing and wakes up every `interval` seconds to
+    send whatever arrived since then as one batched frame. Publishing therefore
+    costs the writer nothing per client, and a burst of packets becomes a single
+    frame instead of one message per event.
+
+    Backpressure is per client. A slow client blocks only its own generator (the
+    socket write), and when it catches up its backlog is handled by its policy:
+      drop_oldest - skip ahead so at most `max_backlog` pending events are kept
+      lossless    - send everything still in the ring, `max_batch` per frame
+    """
+
+    def __init__(self, ring, heartbeat=15.0):
+        self.ring = ring
+        self.heartbeat = heartbeat
+        self._lock = threading.Lock()
+        self._clients = 0
+        self.frames_sent = 0
+        self.events_sent = 0
+        self.events_dropped = 0
+
+    @property
+    def clients(self):
+        return self._clients
+
+    def stream(self, cursor=None, policy="drop_oldest", max_batch=200, max_backlog=1000, interval=0.25):
+        """Generator of SSE frames for one client."""
+        if policy not in POLICIES:
+            policy = "drop_oldest"
+        ring = self.ring
+        if cursor is None:
+            cursor = ring.head  # new clients start from "now"
+        elif cursor > ring.head:
+            cursor = 0  # Last-Event-ID from before a restart: resend what this process has
+
+        with self._lock:
+            self._clients += 1
+        try:
+            yield "retry: 3000\n\n"
+            last_sent = time.monotonic()
+            while True:
+                head = ring.head
+                dropped = 0
+                if head > cursor:
+                    if policy == "drop_oldest" and head - cursor > max_backlog:
+                        dropped = head - cursor - max_backlog
+                        cursor = head - max_backlog
+                    events, cursor, missed = ring.since(cursor, max_batch)
+                    dropped += missed
+                    if dropped:
+                        self.events_dropped += dropped
+                    if events or dropped:
+                        payload = json.dumps({"events": events, "dropped": dropped}, default=str)
+                        yield f"id: {cursor}\nevent: detections\ndata: {payload}\n\n"
+                        self.frames_sent += 1
+                        self.events_sent += len(events)
+                        last_sent = time.monotonic()
+                        if ring.head > cursor:
+                            continue  # backlog left: send the next batch right away
+                elif time.monotonic() - last_sent >= self.heartbeat:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    last_sent = time.monotonic()
+                time.sleep(interval)
+        finally:
+            with self._lock:
+                self._clients -= 1
+
+    def stats(self):
+        return {
+            "clients": self._clients,
+            "frames_sent": self.frames_sent,
+            "events_sent": self.events_sent,
+            "events_dropped": self.events_dropped,
+        }
@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+import weakref
+
+import joblib
+
+from encoders import compile_encoders
+
+MANIFEST_SUFFIX = ".version.json"
+
+
+def manifest_path(model_path):
+    """models/network_model.pkl -> models/network_model.version.json"""
+    return os.path.splitext(model_path)[0] + MANIFEST_SUFFIX
+
+
+def _stat_version(paths):
+    parts = []
+    for path in paths:
+        st = os.stat(path)
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+    return "|".join(parts)
+
+
+def artifact_version(model_path, encoders_path):
+    """Version id of the artifacts currently on disk.
+
+    Bundles written by publish_bundle() carry a manifest whose version is bumped
+    last. Artifacts written any other way (or a model newer than its manifest)
+    fall back to their mtimes/sizes. publish_bundle() replaces the encoders
+    before the model, so whenever the model is new its encoders are too.
+    """
+    manifest = manifest_path(model_path)
+    try:
+        if os.path.getmtime(manifest) >= os.path.getmtime(model_path):
+            with open(manifest) as f:
+                return f"v{json.load(f)['version']}"
+    except (OSError, ValueError, KeyError):
+        pass
+    return _stat_version([model_path, encoders_path])
+
+
+def _atomic_dump(obj, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
+
+def publish_bundle(model, label_encoders, model_path, encoders_path, flat_forest=True):
+    """Atomically publish a retrained model + label encoders for hot-swap.
+
+    Every artifact is written to a temp file and os.replace()d into place, and
+    the version manifest goes last, so a running app either sees the old bundle
+    or the complete new one, and hot-swaps to it without a restart. The
+    flattened forest exports are written after the model so they count as
+    current (not older than the pickle).
+    Returns the new version number.
+    """
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    _atomic_dump(label_encoders, encoders_path)
+    _atomic_dump(model, model_path)
+    if flat_forest:
+        from forest_compiler import (
+            compile_forest, flat_forest_path, save_flat_forest, save_shared_forest, shared_forest_path
+        )
+        try:
+            flat = compile_forest(model)
+        except TypeError as e:
+            # Not a random forest (e.g. gradient boosting): the app scores with model.predict
+            print(f"INFO: No flattened forest exported for {os.path.basename(model_path)} ({e})")
+        else:
+            export_path = flat_forest_path(model_path)
+            tmp = f"{export_path}.{os.getpid()}.tmp.npz"
+            save_flat_forest(flat, tmp)
+            os.replace(tmp, export_path)
+            # Memory-mapped copy shared by all worker processes (see load_serving_model)
+            save_shared_forest(flat, shared_forest_path(model_path))
+
+    manifest = manifest_path(model_path)
+    try:
+        with open(manifest) as f:
+            version = int(json.load(f)["version"]) + 1
+    except (OSError, ValueError, KeyError):
+        version = 1
+    tmp = f"{manifest}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": version, "published": time.time(),
+                   "model": os.path.basename(model_path),
+                   "encoders": os.path.basename(encoders_path)}, f)
+    os.replace(tmp, manifest)
+    print(f"SAVED: Published {os.path.basename(model_path)} as version {version}")
+    return version
+
+
+class ModelBundle:
+    """One loaded, immutable version of a model and its label encoders.
+
+    `predict` is whatever the registry's builder made of the model (flattened
+    forest, process pool, dedup memo...). A request takes a bundle once and uses
+    it to the end, so a hot-swap never changes the model under it.
+    """
+
+    def __init__(self, name, version, model, label_encoders, predict, model_path):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.label_encoders = label_encoders
+        self.encoders = compile_encoders(label_encoders)
+        self.predict = predict
+        self.model_path = model_path
+        self.loaded_at = time.time()
+
+    def to_dict(self):
+        return {"name": self.name, "version": self.version, "loaded_at": self.loaded_at}
+
+
+class ModelRegistry:
+    """Lazily loaded, hot-swappable model bundles.
+
+    Nothing is loaded until a bundle is first asked for (or preload() is
+    called). After that, get() checks at most every `check_interval` seconds
+    whether the artifacts on disk have a new version; if so the new bundle is
+    loaded in the background and swapped in with a single reference assignment.
+    Requests already holding the old bundle carry on with it, and a failed load
+    keeps serving the old one.
+
+    `load_model(model_path)` loads the model (joblib.load by default; the app
+    maps the shared flat forest instead, see forest_compiler.load_serving_model).
+    `build_predict(model, model_path)` turns a loaded model into the predict
+    callable of the bundle; it may return (predict, close) to release resources
+    (e.g. a process pool) once the last user of an old bundle is gone.
+    """
+
+    def __init__(self, model_folder, build_predict=None, check_interval=2.0, load_model=joblib.load):
+        self.model_folder = model_folder
+        self.load_model = load_model
+        self.build_predict = build_predict or (lambda model, model_path: model.predict)
+        self.check_interval = check_interval
+        self._specs = {}
+        self._bundles = {}
+        self._checked = {}
+        self._load_locks = {}
+        self._loading = set()
+        self.swaps = 0
+
+    def register(self, name, model_file, encoders_file):
+        self._specs[name] = (os.path.join(self.model_folder, model_file),
+                             os.path.join(self.model_folder, encoders_file))
+        self._load_locks[name] = threading.Lock()
+
+    @property
+    def names(self):
+        return list(self._specs)
+
+    def _load(self, name, version):
+        model_path, encoders_path = self._specs[name]
+        start = time.perf_counter()
+        model = self.load_model(model_path)
+        label_encoders = joblib.load(encoders_path)
+        built = self.build_predict(model, model_path)
+        predict, close = built if isinstance(built, tuple) else (built, None)
+        bundle = ModelBundle(name, version, model, label_encoders, predict, model_path)
+        if close is not None:
+            weakref.finalize(bundle, close)
+        print(f"DEBUG: Loaded {name} model version {version} in {time.perf_counter() - start:.2f}s")
+        return bundle
+
+    def _swap_in(self, name, version):
+        """Load `version` and make it current; the old bundle stays current until then."""
+        bundle = self._bundles.get(name)
+        try:
+            new_bundle = self._load(name, version)
+        except Exception as e:
+            if bundle is None:
+                raise
+            print(f"DEBUG: Hot-swap of {name} model to {version} failed, keeping {bundle.version}: {e}")
+            return bundle
+        finally:
+            self._loading.discard(name)
+
+        self._bundles[name] = new_bundle  # atomic swap
+        if bundle is not None:
+            self.swaps += 1
+            print(f"DEBUG: Hot-swapped {name} model {bundle.version} -> {version}")
+        return new_bundle
+
+    def get(self, name):
+        """Current bundle for `name`, loading it on first use.
+
+        Only the very first load blocks. A new version found on disk later is
+        loaded on a background thread while callers keep getting the old bundle.
+        """
+        bundle = self._bundles.get(name)
+        now = time.monotonic()
+        if bundle is not None and now - self._checked.get(name, 0) < self.check_interval:
+            return bundle
+
+        with self._load_locks[name]:
+            bundle = self._bundles.get(name)
+            self._checked[name] = time.monotonic()
+            try:
+                version = artifact_version(*self._specs[name])
+            except OSError:
+                if bundle is not None:
+                    return bundle  # Artifacts mid-replace or removed: keep the loaded version
+                raise
+            if bundle is not None and bundle.version == version:
+                return bundle
+
+            if bundle is None:
+                self._loading.add(name)
+                return self._swap_in(name, version)
+            if name not in self._loading:
+                self._loading.add(name)
+                threading.Thread(target=self._swap_in, args=(name, version),
+                                 name=f"model-swap-{name}", daemon=True).start()
+            return bundle
+
+    def preload(self):
+        """Load every registered bundle on a background thread (warm start, no blocking)."""
+        def load_all():
+            for name in self._specs:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"DEBUG: Preloading {name} model failed: {e}")
+        thread = threading.Thread(target=load_all, name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def loaded(self, name):
+        """The bundle currently loaded for `name` (without loading/checking), or None."""
+        return self._bundles.get(name)
+
+    def stats(self):
+        return {
+            "models": {
+                name: (self._bundles[name].to_dict() if name in self._bundles else {"name": name, "version": None})
+                for name in self._specs
+            },
+            "swaps": self.swaps,
+        }
@@ -0,0 +1,140 @@
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from forest_compiler import load_inference_engine, load_serving_model
+
+# Workers are never forked from the app: it runs job, sniffer and scoring threads,
+# and a forked child can inherit a lock one of them held. forkserver is cheapest
+# where it exists (POSIX); Windows only has spawn.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Model loaded once per worker process (by the pool initializer)
+_worker_model = None
+
+
+def _init_worker(model_path, flat):
+    global _worker_model
+    # Flat workers map the shared forest export (one copy of the trees for all of them)
+    _worker_model = load_serving_model(model_path) if flat else joblib.load(model_path)
+    # Parallelism comes from the pool; don't let each worker fan out again
+    if hasattr(_worker_model, "n_jobs"):
+        _worker_model.n_jobs = 1
+    if flat:
+        _worker_model = load_inference_engine(_worker_model, model_path)
+
+
+def _predict_shard(shard):
+    return _worker_model.predict(shard)
+
+
+class ParallelPredictor:
+    """Scores large batches by splitting rows into shards across a process pool.
+
+    Every worker unpickles the model once at start-up, so a batch only pays for
+    sending its shard over. Batches smaller than `min_shard_rows` (or a pool of
+    one worker) are scored in-process with `model`. With `flat=True` the workers
+    score with the flattened forest engine instead of sklearn's predict.
+    """
+
+    def __init__(self, model, model_path, workers=None, min_shard_rows=10000, flat=False):
+        self.model = model
+        self.model_path = model_path
+        self.flat = flat
+        self.workers = workers or os.cpu_count() or 1
+        self.min_shard_rows = min_shard_rows
+        self._pool = None
+        self.last_stats = {}
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(START_METHOD),
+                initializer=_init_worker,
+                initargs=(self.model_path, self.flat),
+            )
+        return self._pool
+
+    def _shards(self, X):
+        n_shards = min(self.workers, math.ceil(len(X) / self.min_shard_rows))
+        bounds = np.linspace(0, len(X), n_shards + 1).astype(int)
+        if isinstance(X, pd.DataFrame):
+            return [X.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+        return [X[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def predict(self, X):
+        start = time.perf_counter()
+        shards = self._shards(X) if len(X) else []
+        if len(shards) <= 1:
+            predictions = self.model.predict(X)
+        else:
+            predictions = np.concatenate(list(self._get_pool().map(_predict_shard, shards)))
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "rows": len(X),
+            "shards": max(len(shards), 1),
+            "seconds": elapsed,
+            "rows_per_sec": len(X) / elapsed if elapsed > 0 else 0.0,
+        }
+        return predictions
+
+    def benchmark(self, X, repeats=3):
+        """Compare single-shot model.predict against the sharded pool on the same batch."""
+        self.predict(X[: self.min_shard_rows])  # Warm up the pool (worker start + model load)
+
+        single = min(_timed(self.model.predict, X) for _ in range(repeats))
+        parallel = min(_timed(self.predict, X) for _ in range(repeats))
+
+        return {
+            "rows": len(X),
+            "workers": self.workers,
+            "shards": self.last_stats.get("shards", 1),
+            "single_seconds": round(single, 4),
+            "parallel_seconds": round(parallel, 4),
+            "speedup": round(single / parallel, 2) if parallel > 0 else None,
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _timed(fn, X):
+    start = time.perf_counter()
+    fn(X)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # Usage: python parallel_inference.py <mode> <csv> [workers]
+    from analysis import FEATURES
+    from encoders import compile_encoders, encode_frame
+
+    mode, csv_path = sys.argv[1], sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    model_path = f"models/{mode}_model.pkl"
+    model = joblib.load(model_path)
+    encoders = compile_encoders(joblib.load(f"models/{mode}_label_encoders.pkl"))
+    X = encode_frame(pd.read_csv(csv_path)[FEATURES[mode]], encoders)
+
+    predictor = ParallelPredictor(model, model_path, workers=workers)
+    try:
+        result = predictor.benchmark(X)
+    finally:
+        predictor.close()
+
+    print(f"RESULT: {result['rows']} rows, {result['workers']} workers, {result['shards']} shards")
+    print(f"  single-shot predict: {result['single_seconds']}s")
+    print(f"  parallel predict:    {result['parallel_seconds']}s")
+    print(f"  speedup:             {result['speedup']}x")
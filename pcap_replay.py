@@ -0,0 +1,283 @@
+import mmap
+import os
+import socket
+import struct
+import sys
+import time
+
+import pandas as pd
+
+from analysis import NETWORK_FEATURES, AnalysisError, analyze_chunks
+from config import CHUNK_SIZE, FLOW_IDLE_TIMEOUT, FLOW_MAX_ACTIVE
+from flow_tracker import FlowTracker
+from result_store import result_filename
+
+# Link-layer types we can decode
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = (0x8100, 0x88A8)
+
+# Identifiers written in front of the model features in the result CSV
+CONNECTION_COLUMNS = ["timestamp", "src_ip", "sport", "dst_ip", "dport"]
+
+# TCP flag byte -> scapy-style letters ("S", "SA", "FA", ...), built once
+_TCP_FLAG_BITS = [(0x01, "F"), (0x02, "S"), (0x04, "R"), (0x08, "P"),
+                  (0x10, "A"), (0x20, "U"), (0x40, "E"), (0x80, "C")]
+TCP_FLAGS = ["".join(letter for bit, letter in _TCP_FLAG_BITS if value & bit) for value in range(256)]
+
+_U16 = struct.Struct("!H")
+_PORTS = struct.Struct("!HH")
+_IPV4 = struct.Struct("!BxHxxHxB")  # version/ihl, total length, flags/fragment offset, protocol
+
+
+def _iter_classic(buf, endian, ts_scale):
+    header = struct.Struct(endian + "IIII")
+    linktype = struct.unpack_from(endian + "I", buf, 20)[0]
+    offset, end = 24, len(buf)
+    while offset + 16 <= end:
+        ts_sec, ts_frac, incl_len, orig_len = header.unpack_from(buf, offset)
+        offset += 16
+        yield ts_sec + ts_frac * ts_scale, linktype, offset, incl_len, orig_len
+        offset += incl_len
+
+
+def _iter_pcapng(buf):
+    end = len(buf)
+    offset = 0
+    endian = "<"
+    interfaces = []  # (linktype, ts_scale) per interface id
+    last_ts = 0.0
+    while offset + 12 <= end:
+        block_type = struct.unpack_from(endian + "I", buf, offset)[0]
+        if block_type == 0x0A0D0D0A:
+            # Section header: byte-order magic decides the endianness of this section
+            endian = "<" if buf[offset + 8:offset + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+        block_len = struct.unpack_from(endian + "I", buf, offset + 4)[0]
+        if block_len < 12:
+            raise AnalysisError("Corrupt pcapng block")
+        body = offset + 8
+
+        if block_type == 1:
+            # Interface description: link type + optional if_tsresol
+            linktype = struct.unpack_from(endian + "H", buf, body)[0]
+            ts_scale = 1e-6
+            opt, opt_end = body + 8, offset + block_len - 4
+            while opt + 4 <= opt_end:
+                code, length = struct.unpack_from(endian + "HH", buf, opt)
+                if code == 0:
+                    break
+                if code == 9 and length >= 1:
+                    resol = buf[opt + 4]
+                    ts_scale = 2.0 ** -(resol & 0x7F) if resol & 0x80 else 10.0 ** -resol
+                opt += 4 + ((length + 3) & ~3)
+            interfaces.append((linktype, ts_scale))
+        elif block_type == 6:
+            # Enhanced packet block
+            iface, ts_high, ts_low, cap_len, orig_len = struct.unpack_from(endian + "IIIII", buf, body)
+            linktype, ts_scale = interfaces[iface]
+            last_ts = ((ts_high << 32) | ts_low) * ts_scale
+            yield last_ts, linktype, body + 20, cap_len, orig_len
+        elif block_type == 3 and interfaces:
+            # Simple packet block (no timestamp)
+            orig_len = struct.unpack_from(endian + "I", buf, body)[0]
+            cap_len = min(orig_len, block_len - 16)
+            yield last_ts, interfaces[0][0], body + 4, cap_len, orig_len
+
+        offset += block_len
+
+
+def iter_packets(buf):
+    """Yield (timestamp, linktype, offset, captured_len, wire_len) for every packet.
+
+    Works directly on the mapped file: nothing is copied or dissected here.
+    """
+    magic = bytes(buf[:4])
+    if magic == b"\xd4\xc3\xb2\xa1":
+        return _iter_classic(buf, "<", 1e-6)
+    if magic == b"\xa1\xb2\xc3\xd4":
+        return _iter_classic(buf, ">", 1e-6)
+    if magic == b"\x4d\x3c\xb2\xa1":
+        return _iter_classic(buf, "<", 1e-9)
+    if magic == b"\xa1\xb2\x3c\x4d":
+        return _iter_classic(buf, ">", 1e-9)
+    if magic == b"\x0a\x0d\x0d\x0a":
+        return _iter_pcapng(buf)
+    raise AnalysisError("Not a pcap/pcapng capture file")
+
+
+def parse_packet(buf, offset, cap_len, wire_len, linktype):
+    """Decode just the IPv4 + TCP/UDP/ICMP header fields the flow tracker needs.
+
+    Returns the same info dict the live sniffer builds, or None for anything
+    that isn't an analysable IPv4 packet.
+    """
+    end = offset + cap_len
+    if linktype == LINKTYPE_ETHERNET:
+        if cap_len < 14:
+            return None
+        ethertype = _U16.unpack_from(buf, offset + 12)[0]
+        offset += 14
+        while ethertype in ETHERTYPE_VLAN and offset + 4 <= end:
+            ethertype = _U16.unpack_from(buf, offset + 2)[0]
+            offset += 4
+        if ethertype != ETHERTYPE_IPV4:
+            return None
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if cap_len < 16 or _U16.unpack_from(buf, offset + 14)[0] != ETHERTYPE_IPV4:
+            return None
+        offset += 16
+    elif linktype == LINKTYPE_NULL:
+        offset += 4
+    elif linktype not in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        return None
+
+    if offset + 20 > end:
+        return None
+    version_ihl, total_len, frag, proto = _IPV4.unpack_from(buf, offset)
+    if version_ihl >> 4 != 4:
+        return None
+    ihl = (version_ihl & 0x0F) * 4
+    if frag & 0x1FFF:
+        return None  # Non-first fragment: no transport header to attribute it to
+
+    info = {
+        "src_ip": socket.inet_ntoa(buf[offset + 12:offset + 16]),
+        "dst_ip": socket.inet_ntoa(buf[offset + 16:offset + 20]),
+        "length": wire_len,
+        "fragment": bool(frag & 0x2000),
+    }
+    l4 = offset + ihl
+    l4_len = total_len - ihl
+    if proto == 6 and l4 + 14 <= end:
+        sport, dport = _PORTS.unpack_from(buf, l4)
+        data_offset = (buf[l4 + 12] >> 4) * 4
+        info.update(protocol="TCP", sport=sport, dport=dport,
+                    tcp_flags=TCP_FLAGS[buf[l4 + 13]], payload=max(l4_len - data_offset, 0))
+    elif proto == 17 and l4 + 8 <= end:
+        sport, dport = _PORTS.unpack_from(buf, l4)
+        info.update(protocol="UDP", sport=sport, dport=dport, payload=max(l4_len - 8, 0))
+    elif proto == 1:
+        info.update(protocol="ICMP", payload=max(l4_len - 8, 0))
+    else:
+        return None
+    return info
+
+
+class ReplayStats:
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.connections = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    @property
+    def packets_per_sec(self):
+        return self.packets / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "skipped_packets": self.skipped,
+            "connections": self.connections,
+            "seconds": round(self.seconds, 3),
+            "packets_per_sec": round(self.packets_per_sec, 1),
+        }
+
+
+def _rows_frame(records):
+    frame = pd.DataFrame([r["features"] for r in records], columns=NETWORK_FEATURES)
+    meta = pd.DataFrame([r["event"] for r in records], columns=CONNECTION_COLUMNS)
+    return pd.concat([meta, frame], axis=1)
+
+
+def iter_connection_chunks(path, stats, chunk_rows=CHUNK_SIZE):
+    """Replay a capture as fast as it can be read, yielding DataFrames of finished connections.
+
+    Packets are fed to a FlowTracker with their capture timestamps (no pacing),
+    so idle timeouts and the 2-second windows follow capture time.
+    """
+    tracker = FlowTracker(idle_timeout=FLOW_IDLE_TIMEOUT, max_flows=FLOW_MAX_ACTIVE)
+    pending = []
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise AnalysisError("Uploaded capture is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buf = memoryview(mapped)
+            try:
+                for ts, linktype, offset, cap_len, wire_len in iter_packets(buf):
+                    stats.packets += 1
+                    stats.bytes += wire_len
+                    info = parse_packet(buf, offset, cap_len, wire_len, linktype)
+                    if info is None:
+                        stats.skipped += 1
+                        continue
+                    pending.extend(tracker.update(info, ts))
+                    if len(pending) >= chunk_rows:
+                        stats.connections += len(pending)
+                        yield _rows_frame(pending)
+                        pending = []
+            except (struct.error, IndexError) as e:
+                # Truncated capture (e.g. copied while still being written): keep what we have
+                print(f"DEBUG: Capture truncated after {stats.packets} packets: {e}")
+            finally:
+                buf.release()
+
+    pending.extend(tracker.flush())
+    stats.seconds = time.perf_counter() - stats.started
+    if pending:
+        stats.connections += len(pending)
+        yield _rows_frame(pending)
+
+
+def analyze_pcap(filepath, predict, encoders, result_folder, chunk_rows=CHUNK_SIZE, progress=None, timer=None):
+    """PCAP -> connections -> network model, producing the same stored result/summary as a CSV upload."""
+    stats = ReplayStats()
+    result_path = os.path.join(result_folder, result_filename("network"))
+    try:
+        summary = analyze_chunks(
+            iter_connection_chunks(filepath, stats, chunk_rows), "network", encoders, predict,
+            result_path, progress=progress, timer=timer,
+        )
+    except AnalysisError as e:
+        if str(e) == "Uploaded CSV is empty":
+            raise AnalysisError("No analysable IPv4 connections found in the capture")
+        raise
+
+    print(f"DEBUG: Replayed {stats.packets} packets ({stats.connections} connections) "
+          f"in {stats.seconds:.2f}s = {stats.packets_per_sec:.0f} packets/sec")
+    summary["pcap"] = stats.to_dict()
+    summary["messages"].append((
+        f"Replayed {stats.packets:,} packets into {stats.connections:,} connections "
+        f"at {stats.packets_per_sec:,.0f} packets/sec.", "info"))
+    return summary
+
+
+if __name__ == "__main__":
+    # Usage: python pcap_replay.py capture.pcap [result_folder]
+    import joblib
+
+    from encoders import compile_encoders
+    from forest_compiler import load_inference_engine
+
+    capture = sys.argv[1]
+    out_folder = sys.argv[2] if len(sys.argv) > 2 else "uploads"
+    os.makedirs(out_folder, exist_ok=True)
+
+    model = load_inference_engine(joblib.load("models/network_model.pkl"), "models/network_model.pkl")
+    encoders = compile_encoders(joblib.load("models/network_label_encoders.pkl"))
+
+    result = analyze_pcap(capture, model.predict, encoders, out_folder)
+    pcap = result["pcap"]
+    print(f"RESULT: {pcap['packets']} packets, {pcap['connections']} connections, "
+          f"{pcap['packets_per_sec']:.0f} packets/sec")
+    print(f"  attacks: {result['total_attacks']} | benign: {result['total_benign']}")
+    print(f"  saved:   {result['result_path']}")
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from result_store import is_parquet, pq, read_result
+
+OPERATORS = ("eq", "ne", "lt", "le", "gt", "ge", "contains")
+MAX_PAGE_SIZE = 500
+
+
+def parse_predicate(text):
+    """"column:op:value" -> (column, op, value). The value may itself contain ':'."""
+    parts = text.split(":", 2)
+    if len(parts) != 3 or parts[1] not in OPERATORS:
+        raise ValueError(f"Bad filter {text!r} (expected column:op:value with op in {', '.join(OPERATORS)})")
+    return tuple(parts)
+
+
+class ResultIndex:
+    """Browsing index over one stored analysis result.
+
+    Only what browsing needs is held in memory: a column is loaded the first
+    time it is sorted or filtered on, and a page reads just the row groups its
+    rows live in (CSV results, written without pyarrow, can't be read by row
+    range and are loaded whole). Sort orders are argsort permutations computed
+    once per (column, direction), filter predicates are boolean masks, and
+    every filter+sort combination is materialised as an array of row
+    positions; masks and views are kept in small LRU caches. A page is then a
+    slice of that array, so paging cost doesn't depend on how deep the cursor
+    is.
+    """
+
+    def __init__(self, path, max_views=32, max_masks=64):
+        self.path = path
+        self.max_views = max_views
+        self.max_masks = max_masks
+        if is_parquet(path):
+            parquet = pq.ParquetFile(path)
+            metadata = parquet.metadata
+            self.frame = None
+            self.columns = list(parquet.schema_arrow.names)
+            self.rows = metadata.num_rows
+            sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+            self._group_starts = np.cumsum([0] + sizes)
+        else:
+            self.frame = read_result(path)
+            self.columns = list(self.frame.columns)
+            self.rows = len(self.frame)
+        self._values = {}
+        self._orders = {}
+        self._masks = OrderedDict()
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.rows
+
+    def _column(self, column):
+        if column not in self.columns:
+            raise ValueError(f"Unknown column {column!r}")
+        if self.frame is not None:
+            return self.frame[column]
+        if column not in self._values:
+            self._values[column] = read_result(self.path, columns=[column])[column]
+        return self._values[column]
+
+    def _order(self, column, descending):
+        key = (column, descending)
+        if key not in self._orders:
+            values = self._column(column)
+            # Stable sort keeps equal values in file order; missing values always go last
+            ordered = values.reset_index(drop=True).sort_values(
+                ascending=not descending, kind="stable", na_position="last")
+            self._orders[key] = ordered.index.to_numpy(dtype=np.int64)
+        return self._orders[key]
+
+    def _mask(self, predicate):
+        mask = self._masks.get(predicate)
+        if mask is not None:
+            self._masks.move_to_end(predicate)
+            return mask
+
+        column, op, value = predicate
+        values = self._column(column)
+        if op == "contains":
+            mask = values.astype(str).str.contains(value, case=False, regex=False)
+        else:
+            if pd.api.types.is_numeric_dtype(values):
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise ValueError(f"Column {column!r} is numeric, got {value!r}")
+            else:
+                values = values.astype(str)
+            mask = {
+                "eq": values == value, "ne": values != value,
+                "lt": values < value, "le": values <= value,
+                "gt": values > value, "ge": values >= value,
+            }[op]
+        mask = self._masks[predicate] = mask.fillna(False).to_numpy(dtype=bool)
+        if len(self._masks) > self.max_masks:
+            self._masks.popitem(last=False)
+        return mask
+
+    def _rows(self, positions):
+        """The stored rows at `positions` (in that order) as a DataFrame."""
+        if self.frame is not None:
+            return self.frame.iloc[positions]
+        if not len(positions):
+            return pd.DataFrame(columns=self.columns)
+        starts = self._group_starts
+        groups = np.searchsorted(starts, positions, side="right") - 1
+        needed = np.unique(groups)
+        table = pq.ParquetFile(self.path, memory_map=True).read_row_groups(needed.tolist())
+        # Where each needed row group begins in the concatenated table
+        offsets = np.zeros(len(starts) - 1, dtype=np.int64)
+        offsets[needed] = np.concatenate(([0], np.cumsum(np.diff(starts)[needed])[:-1]))
+        return table.take(positions - starts[groups] + offsets[groups]).to_pandas()
+
+    def view(self, predicates=(), sort=None, descending=False):
+        """Row positions matching all predicates, in sort order (cached)."""
+        key = (tuple(sorted(set(predicates))), sort, descending)
+        with self._lock:
+            positions = self._views.get(key)
+            if positions is not None:
+                self._views.move_to_end(key)
+                return positions
+
+            positions = self._order(sort, descending) if sort else np.arange(self.rows, dtype=np.int64)
+            if key[0]:
+                mask = np.logical_and.reduce([self._mask(p) for p in key[0]])
+                positions = positions[mask[positions]]
+
+            self._views[key] = positions
+            if len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+            return positions
+
+    def page(self, predicates=(), sort=None, descending=False, cursor=0, limit=100):
+        """One page of rows as a JSON-ready dict.
+
+        `cursor` is the position in the filtered/sorted view returned as
+        `next_cursor` by the previous page (0 for the first page).
+        """
+        positions = self.view(predicates, sort, descending)
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        cursor = max(0, int(cursor))
+        selected = positions[cursor:cursor + limit]
+
+        rows = self._rows(selected)
+        records = json.loads(rows.to_json(orient="records"))
+        for position, record in zip(selected.tolist(), records):
+            record["_row"] = position
+
+        end = cursor + len(selected)
+        return {
+            "columns": self.columns,
+            "rows": records,
+            "total": int(len(positions)),
+            "total_rows": self.rows,
+            "cursor": cursor,
+            "next_cursor": end if end < len(positions) else None,
+        }
+
+
+class ResultBrowser:
+    """Keeps a ResultIndex for the most recently browsed results.
+
+    Indexes are keyed by path and modification time, so a re-run that replaces
+    result_{mode}.parquet gets a fresh index instead of stale pages.
+    """
+
+    def __init__(self, max_results=4):
+        self.max_results = max_results
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self, path):
+        key = (os.path.abspath(path), os.path.getmtime(path))
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+
+        # Build outside the lock: loading a large result shouldn't block other users' pages
+        index = ResultIndex(path)
+        with self._lock:
+            for stale in [k for k in self._indexes if k[0] == key[0]]:
+                del self._indexes[stale]
+            self._indexes[key] = index
+            if len(self._indexes) > self.max_results:
+                self._indexes.popitem(last=False)
+        print(f"DEBUG: Indexed {len(index)} result rows from {path}")
+        return index
+
+    def page(self, path, args):
+        """Serve a page for request query args (see /api/results/<mode>)."""
+        predicates = [parse_predicate(p) for p in args.getlist("filter")]
+        for column in ("Prediction", "Severity"):
+            value = args.get(column.lower())
+            if value:
+                predicates.append((column, "eq", value))
+        return self.index(path).page(
+            predicates,
+            sort=args.get("sort") or None,
+            descending=args.get("order") == "desc",
+            cursor=args.get("cursor", 0),
+            limit=args.get("limit", 100),
+        )
@@ -0,0 +1,152 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+HASH_BLOCK = 1 << 20
+SUMMARY_FILE = "summary.json"
+
+# Summary keys that describe one run (its messages, dedup and replay timings), not
+# the result: a cache hit didn't do that work, so they aren't stored or replayed
+RUN_KEYS = ("result_path", "messages", "dedup", "pcap")
+
+
+def hash_file(path):
+    """Content hash of an uploaded file (streamed, so big uploads aren't loaded)."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_fingerprint(model_folder):
+    """Fingerprint of the trained models and label encoders in `model_folder`.
+
+    Built from the name, size and mtime of every model artifact, so retraining
+    (or swapping in a different models/*.pkl) changes it without hashing the
+    pickles themselves.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    paths = glob.glob(os.path.join(model_folder, "*.pkl")) + glob.glob(os.path.join(model_folder, "*.npz"))
+    for path in sorted(paths):
+        st = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def _link_or_copy(src, dst):
+    """Place `src` at `dst` atomically; hard link when possible so nothing is copied."""
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ResultCache:
+    """Content-addressed cache of finished analyses.
+
+    Entries live in `<folder>/<key>/` (the stored result file plus the summary
+    counts as JSON; per-run details like messages are not kept, see RUN_KEYS). The key hashes the uploaded bytes, the requested mode and
+    the model fingerprint, so re-uploading the same dataset with the same models
+    is served straight from disk, and any change to models/*.pkl makes every
+    old entry unreachable; those are pruned on the next store. The folder is
+    kept under `max_bytes` by evicting least recently used entries.
+    """
+
+    def __init__(self, folder, model_folder, max_bytes=1 << 30):
+        self.folder = folder
+        self.model_folder = model_folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def key(self, filepath, mode, salt=""):
+        """Cache key for an upload; `salt` adds e.g. the versions of the loaded models."""
+        fingerprint = model_fingerprint(self.model_folder)
+        content = hash_file(filepath)
+        return hashlib.blake2b(f"{mode}:{content}:{fingerprint}:{salt}".encode(), digest_size=20).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.folder, key)
+
+    def get(self, key, result_folder):
+        """Summary of a cached analysis with its result placed in `result_folder`, or None."""
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, SUMMARY_FILE)) as f:
+                summary = json.load(f)
+            result_path = os.path.join(result_folder, summary["result_file"])
+            _link_or_copy(os.path.join(entry, summary["result_file"]), result_path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        os.utime(os.path.join(entry, SUMMARY_FILE))  # LRU: touch on every hit
+        self.hits += 1
+        summary["result_path"] = result_path
+        summary["messages"] = [("Identical upload analysed before with the current models: served from cache.", "info")]
+        return summary
+
+    def put(self, key, summary):
+        """Store a finished analysis (its result file is hard linked, not copied)."""
+        entry = self._entry(key)
+        partial = f"{entry}.{os.getpid()}.{threading.get_ident()}.part"
+        result_file = os.path.basename(summary["result_path"])
+        stored = {k: v for k, v in summary.items() if k not in RUN_KEYS}
+        stored["result_file"] = result_file
+        stored["fingerprint"] = model_fingerprint(self.model_folder)
+        stored["created"] = time.time()
+        try:
+            os.makedirs(partial, exist_ok=True)
+            _link_or_copy(summary["result_path"], os.path.join(partial, result_file))
+            with open(os.path.join(partial, SUMMARY_FILE), "w") as f:
+                json.dump(stored, f, default=str)
+            with self._lock:
+                if os.path.exists(entry):
+                    shutil.rmtree(entry, ignore_errors=True)
+                os.replace(partial, entry)
+        except OSError as e:
+            # A cache that can't be written must never fail the analysis itself
+            print(f"DEBUG: Could not cache result {key}: {e}")
+            shutil.rmtree(partial, ignore_errors=True)
+            return
+        self.evict(stored["fingerprint"])
+
+    def evict(self, fingerprint=None):
+        """Drop entries for other model versions, then LRU entries until under max_bytes."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.folder):
+                entry = os.path.join(self.folder, name)
+                summary_path = os.path.join(entry, SUMMARY_FILE)
+                if name.endswith(".part") or not os.path.exists(summary_path):
+                    continue
+                if fingerprint is not None:
+                    try:
+                        with open(summary_path) as f:
+                            stale = json.load(f).get("fingerprint") != fingerprint
+                    except (OSError, ValueError):
+                        stale = True
+                    if stale:
+                        shutil.rmtree(entry, ignore_errors=True)
+                        continue
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                entries.append((os.path.getmtime(summary_path), size, entry))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "max_bytes": self.max_bytes}
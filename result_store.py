@@ -0,0 +1,175 @@
+import json
+import os
+
+import pandas as pd
+
+from config import RESULT_FORMAT
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without pyarrow results fall back to CSV
+    pa = None
+    pq = None
+
+# Parquet (typed, zstd-compressed, columns readable on their own) when pyarrow is installed
+STORAGE_FORMAT = "parquet" if pq is not None and RESULT_FORMAT != "csv" else "csv"
+
+
+def result_filename(mode):
+    return f"result_{mode}.{STORAGE_FORMAT}"
+
+
+def is_parquet(path):
+    return path.endswith(".parquet")
+
+
+class ResultWriter:
+    """Append-only writer for chunked analysis results.
+
+    Parquet files get one compressed row group per chunk. The column types come
+    from the first chunk, with columns that are empty there stored as text;
+    later chunks are converted to them (see _conform), so a column that starts
+    empty and holds text further down doesn't fail the upload. An integer
+    column that later gets fractional values is widened to float64, which
+    rewrites the row groups written so far (see _widen). Everything is
+    written to `<path>.part` and renamed on close(), so readers never see half
+    a result.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.partial_path = path + ".part"
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk):
+        if is_parquet(self.path):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                # Arrow types an all-empty column as null, which no later value fits: use text
+                self._schema = pa.schema(
+                    [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema],
+                    metadata=table.schema.metadata,
+                )
+                self._writer = pq.ParquetWriter(self.partial_path, self._schema, compression="zstd")
+            if not table.schema.equals(self._schema):
+                self._widen(table)
+                table = self._conform(table)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(self.partial_path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(chunk)
+
+    def _widen(self, table):
+        """Switch integer columns to float64 where `table` has floats for them.
+
+        Parquet can't mix types across row groups, so the file written so far
+        is copied row group by row group into one with the wider schema (rare:
+        only whole-number columns that turn fractional further down the upload).
+        """
+        widened = [
+            field.name for field, column in zip(self._schema, table.columns)
+            if pa.types.is_integer(field.type) and pa.types.is_floating(column.type)
+        ]
+        if not widened:
+            return
+        schema = self._schema
+        for name in widened:
+            schema = schema.set(schema.get_field_index(name), pa.field(name, pa.float64()))
+        metadata = schema.metadata or {}
+        if b"pandas" in metadata:
+            # The pandas metadata would otherwise restore the column as Int64
+            pandas_meta = json.loads(metadata[b"pandas"])
+            for col in pandas_meta["columns"]:
+                if col["name"] in widened:
+                    col["pandas_type"] = col["numpy_type"] = "float64"
+                    col["metadata"] = None
+            schema = schema.with_metadata({**metadata, b"pandas": json.dumps(pandas_meta).encode()})
+        print(f"DEBUG: Widening result columns {widened} to float64")
+
+        self._writer.close()
+        old_path = self.partial_path + ".old"
+        os.replace(self.partial_path, old_path)
+        self._schema = schema
+        self._writer = pq.ParquetWriter(self.partial_path, schema, compression="zstd")
+        with open(old_path, "rb") as f:
+            written = pq.ParquetFile(f)
+            for i in range(written.num_row_groups):
+                self._writer.write_table(written.read_row_group(i).cast(schema))
+        os.remove(old_path)
+
+    def _conform(self, table):
+        """Convert a chunk's columns to the file's types.
+
+        Only safe casts: anything becomes text in a text column, and a value
+        that doesn't fit a numeric column raises instead of being truncated.
+        """
+        if table.column_names != self._schema.names:
+            raise ValueError(f"Chunk columns {table.column_names} differ from {self._schema.names}")
+        columns = []
+        for field, column in zip(self._schema, table.columns):
+            if not column.type.equals(field.type):
+                column = column.cast(field.type)
+            columns.append(column)
+        return pa.Table.from_arrays(columns, schema=self._schema)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.partial_path):
+            os.replace(self.partial_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for path in (self.partial_path, self.partial_path + ".old"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def read_result(path, columns=None):
+    """Load a stored result (only `columns`, if given) into a DataFrame.
+
+    Parquet isn't re-parsed as text, but its zstd pages are decompressed and
+    to_pandas() builds a full in-memory copy of the requested columns, so
+    large results should be read with `columns` or iter_result_chunks().
+    """
+    if is_parquet(path):
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return pd.read_csv(path, usecols=columns)
+
+
+def iter_result_chunks(path, chunksize):
+    """Stream a stored result (or a Parquet input) as DataFrame chunks."""
+    if is_parquet(path):
+        parquet = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def iter_csv_export(path, chunksize=50000):
+    """CSV is only an export format: convert the stored result chunk by chunk for download."""
+    if not is_parquet(path):
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    return
+                yield block
+    header = True
+    for chunk in iter_result_chunks(path, chunksize):
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+
+def find_result(folder, mode):
+    """Path of the newest stored result for `mode`, whatever format it was written in."""
+    paths = [os.path.join(folder, f"result_{mode}.{ext}") for ext in ("parquet", "csv")]
+    paths = [p for p in paths if os.path.exists(p)]
+    return max(paths, key=os.path.getmtime) if paths else None
@@ -1,9 +1,10 @@
 import pandas as pd
-import joblib
 from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 import os
+from encoders import compile_encoders, encode_frame
+from model_registry import publish_bundle
 
 # Define NSL-KDD Columns
 columns = [
@@ -82,8 +83,7 @@ try:
 
     # 5. Save Model and Encoders
     os.makedirs("models", exist_ok=True)
-    joblib.dump(model, "models/network_model.pkl")
-    joblib.dump(le_dict, "models/network_label_encoders.pkl")
+    publish_bundle(model, le_dict, "models/network_model.pkl", "models/network_label_encoders.pkl")
     print("SAVED: Improved binary model saved.")
 
     # 6. Final Test
@@ -96,10 +96,7 @@ try:
             X_test = test_df.drop(["label"], axis=1)
             y_test = test_df["label"]
             
-            for col, le in le_dict.items():
-                X_test[col] = X_test[col].astype(str).map(
-                    lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                )
+            encode_frame(X_test, compile_encoders(le_dict))
             
             # Evaluate Binary Accuracy (Normal vs Attack)
             preds_bin = model.predict(X_test)
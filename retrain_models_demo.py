@@ -1,9 +1,9 @@
 import pandas as pd
-import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
+from model_registry import publish_bundle
 
 print("=" * 70)
 print("🔄 RETRAINING MODELS WITH NEW DEMO DATASETS")
@@ -62,9 +62,8 @@ print(f"\nClassification Report:")
 print(classification_report(y_test_net, test_pred_net))
 
 # Save network model
-joblib.dump(network_model, "models/network_model.pkl")
-joblib.dump(le_dict_net, "models/network_label_encoders.pkl")
-print("✅ Saved: models/network_model.pkl & models/network_label_encoders.pkl")
+publish_bundle(network_model, le_dict_net, "models/network_model.pkl", "models/network_label_encoders.pkl")
+print("✅ Saved: models/network_model.pkl & models/network_label_encoders.pkl (+ flattened forest)")
 
 # ==================== WEB INTRUSION MODEL ====================
 print("\n" + "=" * 70)
@@ -120,9 +119,8 @@ print(f"\nClassification Report:")
 print(classification_report(y_test_web, test_pred_web))
 
 # Save web model
-joblib.dump(web_model, "models/web_model.pkl")
-joblib.dump(le_dict_web, "models/web_label_encoders.pkl")
-print("✅ Saved: models/web_model.pkl & models/web_label_encoders.pkl")
+publish_bundle(web_model, le_dict_web, "models/web_model.pkl", "models/web_label_encoders.pkl")
+print("✅ Saved: models/web_model.pkl & models/web_label_encoders.pkl (+ flattened forest)")
 
 # ==================== SUMMARY ====================
 print("\n" + "=" * 70)
@@ -0,0 +1,72 @@
+class DetectionRing:
+    """Fixed-capacity ring buffer of recent live detections.
+
+    Every event gets a monotonically increasing sequence number (`seq`), and
+    readers ask for "everything after the cursor I last saw". The slot list is
+    allocated once, so memory stays flat however long the sniffer runs.
+
+    There is one writer (the live scoring thread) and no lock: the writer fills
+    the slot first and only then advances `head`, and each slot stores its own
+    sequence number. A reader that races with the writer and finds a slot already
+    overwritten by a newer event simply counts it as missed. Both steps are
+    single reference assignments, which are atomic in CPython.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0  # seq of the newest event; 0 = empty
+
+    @property
+    def head(self):
+        return self._head
+
+    def append(self, event):
+        """Add an event (single writer only). Returns its sequence number."""
+        seq = self._head + 1
+        event["seq"] = seq
+        self._slots[seq % self.capacity] = (seq, event)
+        self._head = seq  # publish only after the slot is written
+        return seq
+
+    def latest(self):
+        head = self._head
+        if not head:
+            return None
+        slot = self._slots[head % self.capacity]
+        return slot[1] if slot else None
+
+    def since(self, cursor, limit=None):
+        """Events with seq > cursor, oldest first.
+
+        Returns (events, new_cursor, missed). `missed` counts events the client
+        will never see because the ring wrapped past them. A negative cursor means
+        "just the most recent `limit` events". A cursor ahead of the head comes
+        from before a restart (sequence numbers start again at 1) and is treated
+        as 0, so the returned cursor goes back down and the client resyncs.
+        """
+        head = self._head
+        oldest = max(1, head - self.capacity + 1)
+        if cursor > head:
+            cursor = 0
+        if cursor < 0:
+            cursor = head - (limit or self.capacity)
+            missed = 0
+        else:
+            missed = max(0, oldest - (cursor + 1))
+        start = max(cursor + 1, oldest)
+        end = head if limit is None else min(head, start + limit - 1)
+
+        events = []
+        slots, capacity = self._slots, self.capacity
+        for seq in range(start, end + 1):
+            slot = slots[seq % capacity]
+            if slot is None or slot[0] != seq:
+                # Overwritten by the writer while we were reading
+                missed += 1
+                continue
+            events.append(slot[1])
+        return events, max(end, cursor), missed
+
+    def __len__(self):
+        return min(self._head, self.capacity)
@@ -0,0 +1,135 @@
+import csv
+import io
+
+# NSL-KDD typically has 41, 42, or 43 columns.
+NSL_KDD_COLUMNS = [
+    "duration", "protocol_type", "service", "flag", "src_bytes", "dst_bytes",
+    "land", "wrong_fragment", "urgent", "hot", "num_failed_logins",
+    "logged_in", "num_compromised", "root_shell", "su_attempted", "num_root",
+    "num_file_creations", "num_shells", "num_access_files", "num_outbound_cmds",
+    "is_host_login", "is_guest_login", "count", "srv_count", "serror_rate",
+    "srv_serror_rate", "rerror_rate", "srv_rerror_rate", "same_srv_rate",
+    "diff_srv_rate", "srv_diff_host_rate", "dst_host_count", "dst_host_srv_count",
+    "dst_host_same_srv_rate", "dst_host_diff_srv_rate", "dst_host_same_src_port_rate",
+    "dst_host_srv_diff_host_rate", "dst_host_serror_rate", "dst_host_srv_serror_rate",
+    "dst_host_rerror_rate", "dst_host_srv_rerror_rate", "label", "difficulty"
+]
+
+NETWORK_FEATURES = NSL_KDD_COLUMNS[:41]
+
+WEB_FEATURES = [
+    "request_duration", "http_method", "user_agent_type", "url_length", "param_count",
+    "special_chars_query", "content_length", "cookie_size", "referrer_type",
+    "is_auth_header_present", "num_redirects", "response_code", "response_time",
+    "bot_score", "ip_reputation", "geo_location_id", "session_lifetime",
+    "db_query_count", "file_upload_count", "api_endpoint_id", "is_ajax",
+    "header_entropy", "payload_entropy", "malicious_signatures_count"
+]
+
+# String features (label-encoded by the models); everything else is numeric
+CATEGORICAL_FEATURES = {
+    "network": ["protocol_type", "service", "flag"],
+    "web": ["http_method", "user_agent_type", "referrer_type"],
+}
+
+# Numeric features that hold fractions (rates, durations, sizes, scores); the
+# other numeric features are counts, flags and ids with whole-number values
+FRACTIONAL_FEATURES = {
+    "network": [col for col in NETWORK_FEATURES if col.endswith("_rate")],
+    "web": ["request_duration", "content_length", "response_time", "bot_score",
+            "ip_reputation", "header_entropy", "payload_entropy"],
+}
+
+INTEGER_FEATURES = {
+    mode: [col for col in features if col not in CATEGORICAL_FEATURES[mode] + FRACTIONAL_FEATURES[mode]]
+    for mode, features in (("network", NETWORK_FEATURES), ("web", WEB_FEATURES))
+}
+
+# Columns that only appear in raw CIC-IDS2017 exports
+CICIDS_MARKERS = ("Flow Duration", "Dst Port", "Destination Port")
+
+# How much of the file is read to decide what it is
+SNIFF_BYTES = 16 * 1024
+
+
+class DatasetSchema:
+    """What an uploaded CSV is, decided from its first few KB.
+
+    kind is one of "network", "web", "nsl_kdd" (headerless NSL-KDD), "cicids",
+    "unknown" or "empty". `columns` are the column names to use, `header` says
+    whether the first line holds them, and `dtypes` are the explicit dtypes for
+    the model features (categorical for the string features, float64 for the
+    rest, which is what the models take and parses fastest), so pandas does no
+    type inference on them. Whole-number features are stored as nullable
+    integers after scoring (see analysis.analyze_chunk). Any other column (label,
+    difficulty, extras) is read as text, so its type can't change from one
+    chunk to the next.
+    """
+
+    def __init__(self, kind, columns, header=True, mode=None):
+        self.kind = kind
+        self.columns = columns
+        self.header = header
+        self.mode = mode
+        self.dtypes = {}
+        if mode:
+            self.dtypes = {col: str for col in columns}
+            self.dtypes.update(feature_dtypes(mode, columns))
+
+    def read_csv_kwargs(self):
+        """Arguments for pd.read_csv() that parse the file exactly once."""
+        kwargs = {"dtype": self.dtypes}
+        if self.header:
+            # Replace the (possibly whitespace-padded) header with the cleaned names
+            kwargs.update(header=0, names=self.columns)
+        else:
+            kwargs.update(header=None, names=self.columns)
+        return kwargs
+
+    def __repr__(self):
+        return f"DatasetSchema(kind={self.kind!r}, mode={self.mode!r}, columns={len(self.columns)}, header={self.header})"
+
+
+def feature_dtypes(mode, columns):
+    """Explicit dtypes for the `mode` model features present in `columns`."""
+    categorical = set(CATEGORICAL_FEATURES[mode])
+    features = NETWORK_FEATURES if mode == "network" else WEB_FEATURES
+    present = set(columns)
+    return {
+        col: "category" if col in categorical else "float64"
+        for col in features if col in present
+    }
+
+
+def _sample_lines(filepath, sample_bytes):
+    """First complete line(s) of the file, reading more if the header is very long."""
+    with open(filepath, "rb") as f:
+        sample = f.read(sample_bytes)
+        while sample and b"\n" not in sample:
+            more = f.read(sample_bytes)
+            if not more:
+                break
+            sample += more
+    text = sample.decode("utf-8", errors="replace").lstrip("\ufeff")
+    return [line for line in text.splitlines()[:2] if line.strip()]
+
+
+def sniff_schema(filepath, sample_bytes=SNIFF_BYTES):
+    """Classify a CSV from its first line without parsing the rest of it."""
+    lines = _sample_lines(filepath, sample_bytes)
+    if not lines:
+        return DatasetSchema("empty", [])
+
+    first = [field.strip() for field in next(csv.reader(io.StringIO(lines[0])))]
+    present = set(first)
+
+    if first[0] == "duration" or present.issuperset(NETWORK_FEATURES):
+        return DatasetSchema("network", first, mode="network")
+    if present.issuperset(WEB_FEATURES):
+        return DatasetSchema("web", first, mode="web")
+    if any(marker in present for marker in CICIDS_MARKERS):
+        return DatasetSchema("cicids", first)
+    # Likely headerless NSL-KDD (approx 41-43 cols): the first line is already data
+    if 40 <= len(first) <= 44:
+        return DatasetSchema("nsl_kdd", NSL_KDD_COLUMNS[:len(first)], header=False, mode="network")
+    return DatasetSchema("unknown", first)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from analysis import BENIGN_VALUES, FEATURES, AnalysisError, benign_mask, missing_features_error
+from encoders import encode_frame
+from forest_compiler import FlatForest
+
+# Largest batch accepted in one request (bigger jobs belong in /upload/<mode>)
+MAX_BATCH_ROWS = 100000
+
+
+def is_benign(prediction):
+    """Scalar version of analysis.benign_mask for the single-record path."""
+    return str(prediction).strip().lower() in BENIGN_VALUES
+
+
+def attack_bytes(is_attack):
+    """Binary response: one byte per row, 1 = attack."""
+    return np.asarray(is_attack, dtype=np.uint8).tobytes()
+
+
+def labels(is_attack):
+    """Prediction + Severity lists, same labels as the result CSV."""
+    return {
+        "predictions": ["Attack" if a else "Benign" for a in is_attack],
+        "severities": ["High" if a else "Low" for a in is_attack],
+    }
+
+
+def records_frame(payload):
+    """JSON batch -> DataFrame. Accepts a list of records, {"records": [...]}
+    or the compact {"columns": [...], "rows": [[...], ...]} form.
+
+    Anything malformed raises AnalysisError (a 400), never a pandas error.
+    """
+    try:
+        if isinstance(payload, dict) and "columns" in payload:
+            columns, rows = payload["columns"], payload.get("rows") or []
+            if not isinstance(columns, list) or not all(isinstance(c, str) for c in columns):
+                raise AnalysisError('"columns" must be a list of column names')
+            if not isinstance(rows, list) or not all(isinstance(r, list) for r in rows):
+                raise AnalysisError('"rows" must be a list of value lists')
+            frame = pd.DataFrame(rows, columns=columns)
+        else:
+            records = payload.get("records") if isinstance(payload, dict) else payload
+            if not isinstance(records, list):
+                raise AnalysisError('Expected a list of records, {"records": [...]} or {"columns": [...], "rows": [...]}')
+            if not all(isinstance(r, dict) for r in records):
+                raise AnalysisError("Every record must be a JSON object of column: value")
+            frame = pd.DataFrame.from_records(records)
+    except (TypeError, ValueError) as e:
+        raise AnalysisError(f"Malformed records: {e}")
+    if frame.empty:
+        raise AnalysisError("No records to score")
+    if len(frame) > MAX_BATCH_ROWS:
+        raise AnalysisError(f"Batch too large ({len(frame)} rows, max {MAX_BATCH_ROWS}); upload it as a file instead")
+    return frame
+
+
+def score_frame(frame, mode, bundle):
+    """Batch path: same column selection + encoders + predict as an upload. Returns is_attack."""
+    error = missing_features_error(frame.columns, mode)
+    if error:
+        raise AnalysisError(error)
+    try:
+        X = encode_frame(frame[FEATURES[mode]].copy(), bundle.encoders)
+    except Exception as e:
+        raise AnalysisError(f"Data processing error: {e}")
+    return ~benign_mask(bundle.predict(X))
+
+
+def score_binary(data, mode, bundle):
+    """Binary path: rows of already-encoded float32 features in FEATURES[mode] order."""
+    features = FEATURES[mode]
+    matrix = np.frombuffer(data, dtype="<f4") if len(data) % 4 == 0 else None
+    if matrix is None or not matrix.size or matrix.size % len(features):
+        raise AnalysisError(f"Body is not a whole number of {len(features)}-feature float32 rows")
+    X = pd.DataFrame(matrix.reshape(-1, len(features)), columns=features)
+    if len(X) > MAX_BATCH_ROWS:
+        raise AnalysisError(f"Batch too large ({len(X)} rows, max {MAX_BATCH_ROWS})")
+    return ~benign_mask(bundle.predict(X))
+
+
+def score_record(record, mode, bundle):
+    """Single-record fast path: no DataFrame, no pandas encoding, one flat-forest call.
+
+    Categorical values go through the precompiled encoders' hash lookup
+    (encode_one) straight into a 1-row NumPy vector. Returns True for an attack.
+    """
+    features = FEATURES[mode]
+    encoders = bundle.encoders
+    row = np.empty((1, len(features)), dtype=np.float64)
+    try:
+        for i, feature in enumerate(features):
+            value = record[feature]
+            encoder = encoders.get(feature)
+            row[0, i] = encoder.encode_one(value) if encoder is not None else float(value)
+    except KeyError:
+        raise AnalysisError(missing_features_error(record.keys(), mode))
+    except (TypeError, ValueError) as e:
+        raise AnalysisError(f"Bad value for {feature!r}: {e}")
+
+    if isinstance(bundle.model, FlatForest):
+        prediction = bundle.model.predict(row)[0]
+    else:
+        # One row: with FLAT_FOREST_MAX_ROWS set, the bundle's predict routes it to the flat engine
+        prediction = bundle.predict(pd.DataFrame(row, columns=features))[0]
+    return not is_benign(prediction)
+
+
+def schema(mode, bundle):
+    """Feature order and categorical codes, for clients that send encoded binary rows."""
+    return {
+        "mode": mode,
+        "features": FEATURES[mode],
+        "categorical": {col: [str(c) for c in enc.classes_] for col, enc in bundle.encoders.items()},
+        "model_version": bundle.version,
+        "binary_format": "little-endian float32, row-major, one row per record; unknown categories = -1",
+    }
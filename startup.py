@@ -0,0 +1,52 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Wall-clock time spent bringing up each subsystem, for the startup report.
+
+    mark(name) attributes the time since the previous mark to `name` (for
+    straight-line module code); stage(name) times a block; record() adds a
+    duration measured elsewhere (e.g. on a background thread).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.record(name, now - self._last_mark)
+        self._last_mark = now
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self, title="Startup"):
+        """Print the per-subsystem breakdown and return it as a dict (milliseconds)."""
+        with self._lock:
+            stages = dict(self.stages)
+        since_start = time.perf_counter() - self.started
+        print(f"DEBUG: {title} timing ({since_start * 1000:.0f} ms since startup began):")
+        for name, seconds in stages.items():
+            print(f"DEBUG:   {name:<32} {seconds * 1000:8.1f} ms")
+        return {
+            "since_start_ms": round(since_start * 1000, 1),
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in stages.items()},
+        }
+
+
+# Created on first import, so the first mark includes everything imported before it
+startup_timer = StartupTimer()
@@ -0,0 +1,260 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import NETWORK_FEATURES, WEB_FEATURES
+
+# Rows generated (and written) per chunk; memory is bounded by this, not the dataset size
+CHUNK_ROWS = 500000
+
+SERVICES = np.array(["ftp_data", "ftp", "ssh", "telnet", "smtp", "http", "private", "other"])
+PROTOCOLS = np.array(["tcp", "udp", "icmp"])
+NETWORK_ATTACKS = np.array(["neptune", "mscan", "saint", "portsweep"])
+METHODS = np.array(["GET", "POST", "PUT", "DELETE"])
+AGENTS = np.array(["Chrome", "Firefox", "Safari", "Bot", "Unknown"])
+REFERRERS = np.array(["internal", "external", "none"])
+RESPONSE_CODES = np.array([200, 200, 200, 404, 500, 302])
+WEB_ATTACKS = np.array(["sql_injection", "xss", "lfi", "rce"])
+
+# Same defaults as regenerate_demo_datasets.py
+NETWORK_ACCURACY_TARGET = 0.915
+WEB_ACCURACY_TARGET = 0.905
+
+
+def _randint(rng, low, high, n):
+    """random.randint semantics (both ends inclusive), n at a time."""
+    return rng.integers(low, high + 1, size=n)
+
+
+def _labels(rng, n, attack_ratio, accuracy_target, attack_names):
+    """Label per row plus whether its features follow the attack pattern.
+
+    A (1 - accuracy_target) share of rows are noise: their features show the
+    opposite pattern of their label, which is what caps model accuracy.
+    """
+    label_is_attack = rng.random(n) > 1.0 - attack_ratio
+    is_noise = rng.random(n) > accuracy_target
+    pattern_is_attack = label_is_attack ^ is_noise
+    label = np.where(label_is_attack, rng.choice(attack_names, size=n), "normal")
+    return label, pattern_is_attack
+
+
+def network_chunk(rng, n, accuracy_target=NETWORK_ACCURACY_TARGET):
+    """n rows of demo_network.csv, every column drawn as one array."""
+    label, attack = _labels(rng, n, 0.3, accuracy_target, NETWORK_ATTACKS)
+    serror_rate = np.where(attack, 1.0, 0.0)
+    zeros = np.zeros(n, dtype=np.int64)
+    fzeros = np.zeros(n)
+
+    columns = {
+        "duration": np.where(attack, _randint(rng, 500, 2000, n), _randint(rng, 0, 40, n)),
+        "protocol_type": rng.choice(PROTOCOLS, size=n),
+        "service": rng.choice(SERVICES, size=n),
+        "flag": np.where(attack, rng.choice(np.array(["S0", "REJ"]), size=n), "SF"),
+        "src_bytes": np.where(attack, _randint(rng, 10000, 50000, n), _randint(rng, 50, 600, n)),
+        "dst_bytes": np.where(attack, _randint(rng, 20000, 80000, n), _randint(rng, 100, 1500, n)),
+        "land": zeros, "wrong_fragment": zeros, "urgent": zeros,
+        "hot": _randint(rng, 0, 1, n),
+        "num_failed_logins": zeros,
+        "logged_in": np.where(attack, 0, 1),
+        "num_compromised": zeros, "root_shell": zeros, "su_attempted": zeros, "num_root": zeros,
+        "num_file_creations": zeros, "num_shells": zeros, "num_access_files": zeros,
+        "num_outbound_cmds": zeros, "is_host_login": zeros, "is_guest_login": zeros,
+        "count": np.where(attack, _randint(rng, 150, 255, n), _randint(rng, 1, 10, n)),
+        "srv_count": _randint(rng, 1, 30, n),
+        "serror_rate": serror_rate, "srv_serror_rate": serror_rate,
+        "rerror_rate": fzeros, "srv_rerror_rate": fzeros,
+        "same_srv_rate": np.where(attack, 0.1, 1.0),
+        "diff_srv_rate": fzeros, "srv_diff_host_rate": fzeros,
+        "dst_host_count": np.full(n, 255), "dst_host_srv_count": np.full(n, 255),
+        "dst_host_same_srv_rate": np.where(attack, 0.1, 1.0),
+        "dst_host_diff_srv_rate": fzeros,
+        "dst_host_same_src_port_rate": np.full(n, 0.5),
+        "dst_host_srv_diff_host_rate": fzeros,
+        "dst_host_serror_rate": serror_rate, "dst_host_srv_serror_rate": serror_rate,
+        "dst_host_rerror_rate": fzeros, "dst_host_srv_rerror_rate": fzeros,
+        "label": label,
+    }
+    return pd.DataFrame(columns, columns=NETWORK_FEATURES + ["label"])
+
+
+def web_chunk(rng, n, accuracy_target=WEB_ACCURACY_TARGET):
+    """n rows of demo_web.csv, every column drawn as one array."""
+    label, attack = _labels(rng, n, 0.2, accuracy_target, WEB_ATTACKS)
+
+    columns = {
+        "request_duration": _randint(rng, 5, 500, n),
+        "http_method": rng.choice(METHODS, size=n),
+        "user_agent_type": rng.choice(AGENTS, size=n),
+        "url_length": np.where(attack, _randint(rng, 300, 1500, n), _randint(rng, 15, 80, n)),
+        "param_count": _randint(rng, 0, 10, n),
+        "special_chars_query": np.where(attack, _randint(rng, 20, 80, n), _randint(rng, 0, 4, n)),
+        "content_length": _randint(rng, 100, 10000, n),
+        "cookie_size": _randint(rng, 50, 2000, n),
+        "referrer_type": rng.choice(REFERRERS, size=n),
+        "is_auth_header_present": _randint(rng, 0, 1, n),
+        "num_redirects": _randint(rng, 0, 3, n),
+        # regenerate_demo_datasets.py computes 403/200 per pattern but writes a random code
+        "response_code": rng.choice(RESPONSE_CODES, size=n),
+        "response_time": _randint(rng, 10, 1000, n),
+        "bot_score": np.where(attack, 1.0, 0.0),
+        "ip_reputation": np.round(rng.uniform(0, 1, n), 2),
+        "geo_location_id": _randint(rng, 1, 200, n),
+        "session_lifetime": _randint(rng, 60, 3600, n),
+        "db_query_count": _randint(rng, 0, 50, n),
+        "file_upload_count": _randint(rng, 0, 2, n),
+        "api_endpoint_id": _randint(rng, 1, 500, n),
+        "is_ajax": _randint(rng, 0, 1, n),
+        "header_entropy": np.round(rng.uniform(2, 6, n), 2),
+        "payload_entropy": np.round(rng.uniform(2, 6, n), 2),
+        "malicious_signatures_count": np.where(attack, _randint(rng, 2, 8, n), 0),
+        "label": label,
+    }
+    return pd.DataFrame(columns, columns=WEB_FEATURES + ["label"])
+
+
+def _uniform2(rng, low, high, n):
+    return np.round(rng.uniform(low, high, n), 2)
+
+
+def expanded_network_chunk(rng, n, normal_ratio=0.7):
+    """n rows of expand_demo_datasets.py's network data (generate_network_record)."""
+    attack = rng.random(n) >= normal_ratio
+    label = np.where(attack, rng.choice(np.array(["neptune", "mscan", "saint", "smurf"]), size=n), "normal")
+    zeros = np.zeros(n, dtype=np.int64)
+
+    def pick(attack_values, normal_values):
+        return np.where(attack, attack_values, normal_values)
+
+    columns = {
+        "duration": pick(_randint(rng, 0, 500, n), _randint(rng, 0, 100, n)),
+        "protocol_type": rng.choice(PROTOCOLS, size=n),
+        "service": rng.choice(np.append(SERVICES, "eco_i"), size=n),
+        "flag": pick(rng.choice(np.array(["S0", "REJ", "RSTO", "S1", "S2"]), size=n), "SF"),
+        "src_bytes": pick(_randint(rng, 0, 2000, n), _randint(rng, 50, 500, n)),
+        "dst_bytes": pick(_randint(rng, 0, 10000, n), _randint(rng, 0, 5000, n)),
+        "land": zeros,
+        "wrong_fragment": pick(_randint(rng, 0, 1, n), 0),
+        "urgent": pick(_randint(rng, 0, 1, n), 0),
+        "hot": pick(_randint(rng, 1, 10, n), _randint(rng, 0, 2, n)),
+        "num_failed_logins": pick(_randint(rng, 1, 20, n), 0),
+        "logged_in": pick(0, (rng.random(n) > 0.3).astype(np.int64)),
+        "num_compromised": pick(_randint(rng, 0, 5, n), 0),
+        "root_shell": pick(_randint(rng, 0, 1, n), 0),
+        "su_attempted": pick(_randint(rng, 0, 1, n), 0),
+        "num_root": pick(_randint(rng, 0, 10, n), 0),
+        "num_file_creations": _randint(rng, 0, 3, n),
+        "num_shells": pick(_randint(rng, 0, 5, n), 0),
+        "num_access_files": _randint(rng, 0, 2, n),
+        "num_outbound_cmds": zeros, "is_host_login": zeros, "is_guest_login": zeros,
+        "count": pick(_randint(rng, 10, 500, n), _randint(rng, 1, 20, n)),
+        "srv_count": pick(_randint(rng, 5, 200, n), _randint(rng, 1, 20, n)),
+        "serror_rate": pick(_uniform2(rng, 0.5, 1.0, n), _uniform2(rng, 0, 0.5, n)),
+        "srv_serror_rate": pick(_uniform2(rng, 0.5, 1.0, n), _uniform2(rng, 0, 0.5, n)),
+        "dst_host_count": _randint(rng, 1, 255, n),
+        "dst_host_srv_count": _randint(rng, 1, 255, n),
+        "label": label,
+    }
+    for column in NETWORK_FEATURES:
+        if column not in columns:
+            columns[column] = _uniform2(rng, 0, 1, n)  # the remaining *_rate columns
+    return pd.DataFrame(columns, columns=NETWORK_FEATURES + ["label"])
+
+
+def expanded_web_chunk(rng, n, normal_ratio=0.7):
+    """n rows of expand_demo_datasets.py's "web" data (network schema, HTTP-shaped traffic)."""
+    attack = rng.random(n) >= normal_ratio
+    label = np.where(attack, rng.choice(np.array(["neptune", "portsweep", "nmap"]), size=n), "normal")
+    zeros = np.zeros(n, dtype=np.int64)
+
+    def pick(attack_values, normal_values):
+        return np.where(attack, attack_values, normal_values)
+
+    columns = {
+        "duration": pick(_randint(rng, 0, 300, n), _randint(rng, 0, 50, n)),
+        "protocol_type": np.full(n, "tcp"),
+        "service": pick(rng.choice(np.array(["http", "smtp", "ftp"]), size=n), "http"),
+        "flag": pick(rng.choice(np.array(["SF", "REJ", "S0"]), size=n), "SF"),
+        "src_bytes": pick(_randint(rng, 0, 5000, n), _randint(rng, 50, 500, n)),
+        "dst_bytes": pick(_randint(rng, 0, 50000, n), _randint(rng, 100, 3000, n)),
+        "land": zeros,
+        "wrong_fragment": pick(_randint(rng, 0, 1, n), 0),
+        "urgent": pick(_randint(rng, 0, 1, n), 0),
+        "hot": pick(_randint(rng, 0, 10, n), _randint(rng, 0, 1, n)),
+        "num_failed_logins": pick(_randint(rng, 0, 5, n), 0),
+        "logged_in": pick(_randint(rng, 0, 1, n), 1),
+        "num_compromised": pick(_randint(rng, 0, 3, n), 0),
+        "root_shell": pick(_randint(rng, 0, 1, n), 0),
+        "su_attempted": pick(_randint(rng, 0, 1, n), 0),
+        "num_root": pick(_randint(rng, 0, 5, n), 0),
+        "num_file_creations": pick(_randint(rng, 0, 2, n), 0),
+        "num_shells": pick(_randint(rng, 0, 3, n), 0),
+        "num_access_files": pick(_randint(rng, 0, 2, n), 0),
+        "num_outbound_cmds": zeros, "is_host_login": zeros, "is_guest_login": zeros,
+        "count": pick(_randint(rng, 50, 500, n), _randint(rng, 1, 10, n)),
+        "srv_count": pick(_randint(rng, 50, 500, n), _randint(rng, 1, 10, n)),
+        "serror_rate": pick(_uniform2(rng, 0.3, 1.0, n), 0.0),
+        "srv_serror_rate": pick(_uniform2(rng, 0.3, 1.0, n), 0.0),
+        "rerror_rate": pick(_uniform2(rng, 0, 1.0, n), 0.0),
+        "srv_rerror_rate": pick(_uniform2(rng, 0, 1.0, n), 0.0),
+        "same_srv_rate": pick(_uniform2(rng, 0, 0.5, n), rng.uniform(0.8, 1.0, n)),
+        "diff_srv_rate": pick(_uniform2(rng, 0.5, 1.0, n), rng.uniform(0, 0.2, n)),
+        "srv_diff_host_rate": pick(_uniform2(rng, 0, 1.0, n), 0.0),
+        "dst_host_count": pick(_randint(rng, 50, 255, n), _randint(rng, 1, 50, n)),
+        "dst_host_srv_count": pick(_randint(rng, 50, 255, n), _randint(rng, 1, 50, n)),
+        "dst_host_same_srv_rate": pick(_uniform2(rng, 0, 1.0, n), _uniform2(rng, 0.7, 1.0, n)),
+        "dst_host_diff_srv_rate": pick(_uniform2(rng, 0, 1.0, n), _uniform2(rng, 0, 0.3, n)),
+        "dst_host_same_src_port_rate": pick(_uniform2(rng, 0, 1.0, n), _uniform2(rng, 0.7, 1.0, n)),
+        "dst_host_srv_diff_host_rate": pick(_uniform2(rng, 0, 1.0, n), _uniform2(rng, 0, 0.3, n)),
+        "dst_host_serror_rate": pick(_uniform2(rng, 0.3, 1.0, n), 0.0),
+        "dst_host_srv_serror_rate": pick(_uniform2(rng, 0.3, 1.0, n), 0.0),
+        "dst_host_rerror_rate": pick(_uniform2(rng, 0, 1.0, n), 0.0),
+        "dst_host_srv_rerror_rate": pick(_uniform2(rng, 0, 1.0, n), 0.0),
+        "label": label,
+    }
+    return pd.DataFrame(columns, columns=NETWORK_FEATURES + ["label"])
+
+
+GENERATORS = {
+    "network": network_chunk,
+    "web": web_chunk,
+    "expanded_network": expanded_network_chunk,
+    "expanded_web": expanded_web_chunk,
+}
+
+
+def iter_chunks(kind, rows, seed=None, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames totalling `rows` rows. Deterministic for a given seed and chunk size."""
+    generate = GENERATORS[kind]
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_rows):
+        yield generate(rng, min(chunk_rows, rows - start))
+
+
+def write_dataset(kind, rows, path, seed=None, chunk_rows=CHUNK_ROWS):
+    """Stream a generated dataset to CSV chunk by chunk. Returns rows/sec."""
+    start = time.perf_counter()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        for chunk in iter_chunks(kind, rows, seed, chunk_rows):
+            chunk.to_csv(tmp, mode="a" if written else "w", header=not written, index=False)
+            written += len(chunk)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    elapsed = time.perf_counter() - start
+    return written / elapsed if elapsed > 0 else 0.0
+
+
+if __name__ == "__main__":
+    # Usage: python vectorized_datasets.py network|web|expanded_network|expanded_web ROWS OUT.csv [SEED]
+    kind, rows, out_path = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    rate = write_dataset(kind, rows, out_path, seed)
+    print(f"✅ Created {out_path}: {rows:,} {kind} rows at {rate:,.0f} rows/sec")
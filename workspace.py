@@ -0,0 +1,136 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+
+
+class WorkspaceFullError(Exception):
+    """The upload workspaces are over their disk quota (shown to the user)."""
+
+
+def folder_size(path):
+    """Bytes used by every file under `path` (0 if it is gone)."""
+    total = 0
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total += folder_size(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            pass
+    return total
+
+
+class Workspace:
+    """One analysis job's private folder: its input copy and its result live here."""
+
+    def __init__(self, root, workspace_id):
+        self.id = workspace_id
+        self.path = os.path.join(root, workspace_id)
+
+    def input_path(self, extension):
+        return os.path.join(self.path, f"input{extension}")
+
+
+class WorkspaceManager:
+    """Per-job upload workspaces (`root/<job id>/`) with TTL cleanup and a disk quota.
+
+    Every upload gets a fresh folder, so concurrent analyses never share an
+    input or result path. Workspaces in use by a queued or running job are
+    never removed; the others are deleted `ttl` seconds after their last use.
+    The quota is checked when a workspace is created: if the workspaces (plus
+    the expected upload size) would exceed `quota_bytes`, expired workspaces
+    are cleaned up first and the upload is refused if that isn't enough.
+    Cleanup also runs opportunistically, at most every `cleanup_interval` seconds.
+    """
+
+    def __init__(self, root, ttl=24 * 3600, quota_bytes=10 * 1024 ** 3, cleanup_interval=300):
+        self.root = root
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.cleanup_interval = cleanup_interval
+        self._active = set()
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self.removed = 0
+        self.refused = 0
+
+    def create(self, expected_bytes=0, workspace_id=None):
+        """New workspace, marked in use until release(). Raises WorkspaceFullError over quota."""
+        self.maybe_cleanup()
+        if self.quota_bytes and self.usage() + expected_bytes > self.quota_bytes:
+            self.cleanup()
+            if self.usage() + expected_bytes > self.quota_bytes:
+                self.refused += 1
+                raise WorkspaceFullError(
+                    "Upload storage is full. Try again once older analyses have expired.")
+
+        workspace = Workspace(self.root, workspace_id or uuid.uuid4().hex)
+        os.makedirs(workspace.path, exist_ok=False)
+        with self._lock:
+            self._active.add(workspace.id)
+        return workspace
+
+    def get(self, workspace_id):
+        """The workspace with this id, or None once it has expired."""
+        workspace = Workspace(self.root, workspace_id)
+        return workspace if os.path.isdir(workspace.path) else None
+
+    def release(self, workspace_id):
+        """The job is finished with it: the TTL counts from now."""
+        with self._lock:
+            self._active.discard(workspace_id)
+        try:
+            os.utime(os.path.join(self.root, workspace_id))
+        except OSError:
+            pass
+
+    def usage(self):
+        return folder_size(self.root)
+
+    def maybe_cleanup(self):
+        if time.monotonic() - self._last_cleanup >= self.cleanup_interval:
+            self.cleanup()
+
+    def cleanup(self, now=None):
+        """Delete workspaces unused for longer than the TTL. Returns how many were removed."""
+        self._last_cleanup = time.monotonic()
+        now = now or time.time()
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return 0
+        for entry in entries:
+            with self._lock:
+                if entry.name in self._active:
+                    continue
+            try:
+                expired = entry.is_dir() and now - entry.stat().st_mtime > self.ttl
+            except OSError:
+                continue
+            if expired:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            self.removed += removed
+            print(f"DEBUG: Removed {removed} expired job workspaces")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            active = len(self._active)
+        return {
+            "active": active,
+            "usage_bytes": self.usage(),
+            "quota_bytes": self.quota_bytes,
+            "ttl_seconds": self.ttl,
+            "removed": self.removed,
+            "refused": self.refused,
+        }